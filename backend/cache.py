@@ -0,0 +1,136 @@
+"""
+In-process result caches.
+
+`prediction_cache` stores the outcome of a full assessment (probability, LLM
+text and rendered PDFs) so an identical resubmission skips the scaler, the
+model and, above all, the LLM call. Streamlit keeps imported modules alive
+between reruns, so the cache is shared by every session in an app process.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from backend.metrics import PDF_RENDER_SECONDS
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "1024"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+# Distinct report headers kept per cached prediction (least recently used dropped)
+PDFS_PER_PREDICTION = int(os.getenv("PDFS_PER_PREDICTION", "4"))
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ttl seconds."""
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def update(self, key, func):
+        """
+        Call func(value) while holding the cache lock and return its result.
+
+        Lets callers modify a mutable cached value without racing other
+        threads. Returns None when the key is missing or expired.
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                return None
+            return func(item[1])
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+prediction_cache = TTLCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+
+
+def prediction_cache_key(model_name, model_version, feature_vector, lang, context=""):
+    """
+    Hash an encoded feature vector into a cache key.
+
+    Args:
+        model_name: Model key, e.g. "heart"
+        model_version: Version of the predictor that scored the vector
+        feature_vector: Encoded model inputs in feature order
+        lang: UI language, since the LLM answers in it
+        context: Any other text the result depends on (e.g. the LLM prompt,
+            which also carries inputs the model does not use)
+    """
+    canonical = json.dumps([
+        model_name,
+        model_version,
+        lang,
+        [repr(float(x)) for x in feature_vector],
+        context,
+    ])
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def cached_pdf(cache_key, patient_info, render):
+    """
+    Return the PDF stored with a cached prediction, rendering it only once.
+    This is the only report cache, so its size and lifetime follow
+    PREDICTION_CACHE_SIZE and PREDICTION_CACHE_TTL, with at most
+    PDFS_PER_PREDICTION headers kept per prediction.
+
+    Args:
+        cache_key: Key of the prediction the PDF belongs to (may be None)
+        patient_info: Header text, which can change after the assessment
+        render: Zero-argument callable producing the PDF bytes
+    """
+    if not cache_key:
+        return render()
+    start = time.perf_counter()
+    pdf = prediction_cache.update(cache_key, lambda entry: _lookup_pdf(entry, patient_info))
+    if pdf is not None:
+        PDF_RENDER_SECONDS.observe(time.perf_counter() - start, cache="hit")
+        return pdf
+    # Render outside the lock; a concurrent render of the same header just stores twice
+    pdf = render()
+    prediction_cache.update(cache_key, lambda entry: _store_pdf(entry, patient_info, pdf))
+    return pdf
+
+
+def _lookup_pdf(entry, patient_info):
+    pdfs = entry.get("pdfs")
+    if pdfs is None or patient_info not in pdfs:
+        return None
+    pdfs.move_to_end(patient_info)
+    return pdfs[patient_info]
+
+
+def _store_pdf(entry, patient_info, pdf):
+    pdfs = entry.setdefault("pdfs", OrderedDict())
+    pdfs[patient_info] = pdf
+    pdfs.move_to_end(patient_info)
+    while len(pdfs) > PDFS_PER_PREDICTION:
+        pdfs.popitem(last=False)
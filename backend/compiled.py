@@ -0,0 +1,454 @@
+"""
+NumPy-only compiled representation of the fitted scaler/model pairs.
+
+`export_pipeline` flattens a fitted StandardScaler plus a LogisticRegression,
+SVC, RandomForestClassifier or GradientBoostingClassifier into plain arrays
+(weight vectors, support vectors, tree nodes laid out for evaluation). `CompiledModel`
+evaluates those arrays with NumPy alone, so serving never imports sklearn.
+
+Export all models with:
+    python -m backend.compiled
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+COMPILED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled")
+FORMAT_VERSION = 2
+
+# libsvm clips pairwise probabilities to this range before coupling them
+_SVM_MIN_PROB = 1e-7
+# Trees with at most this many leaves are exported for bitmask evaluation; the
+# cost grows with the node count, so deeper forests walk faster (diabetes,
+# up to 64 leaves, 1000 rows: 43 ms bitmask vs 23 ms walk)
+_MAX_BITMASK_LEAVES = 16
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 of a file, used to tie artifacts to their .sav source."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ─────────────── Export (requires sklearn objects) ─────────────── #
+def _export_scaler(scaler, n_features):
+    if scaler is None:
+        return np.zeros(n_features), np.ones(n_features)
+    mean = scaler.mean_ if getattr(scaler, "with_mean", True) and scaler.mean_ is not None else np.zeros(n_features)
+    scale = scaler.scale_ if getattr(scaler, "with_std", True) and scaler.scale_ is not None else np.ones(n_features)
+    return np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+
+
+def _float32_floor(threshold):
+    """
+    Round float64 thresholds down to float32.
+
+    sklearn compares float32 inputs against float64 thresholds; for a float32
+    x, x <= t exactly when x <= the largest float32 not above t, so the
+    comparison stays exact with float32 thresholds.
+    """
+    threshold32 = threshold.astype(np.float32)
+    return np.where(threshold32.astype(np.float64) > threshold,
+                    np.nextafter(threshold32, np.float32(-np.inf)), threshold32)
+
+
+def _flatten_trees(trees, leaf_values):
+    """
+    Concatenate decision trees into shared node arrays for the tree walk.
+
+    Children are interleaved as [right, left] per node so one step is a single
+    gather indexed by the comparison result. Leaves point back to themselves
+    so every tree can be walked for the same number of steps without masking.
+    """
+    roots, children, feature, threshold, value = [], [], [], [], []
+    offset = 0
+    for tree, leaf_value in zip(trees, leaf_values):
+        node_ids = np.arange(tree.node_count) + offset
+        is_leaf = tree.children_left == -1
+        roots.append(offset)
+        children.append(np.column_stack([
+            np.where(is_leaf, node_ids, tree.children_right + offset),
+            np.where(is_leaf, node_ids, tree.children_left + offset),
+        ]).ravel())
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, 0.0, tree.threshold))
+        value.append(leaf_value)
+        offset += tree.node_count
+    return {
+        "roots": np.asarray(roots, dtype=np.int64),
+        "children": np.concatenate(children).astype(np.int64),
+        "feature": np.concatenate(feature).astype(np.int64),
+        "threshold": _float32_floor(np.concatenate(threshold).astype(np.float64)),
+        "value": np.concatenate(value).astype(np.float64),
+    }
+
+
+def _leaf_ranges(tree):
+    """
+    Number leaves left to right; return (internal nodes in preorder, their
+    left-subtree leaf ranges, leaf node ids in order).
+    """
+    left, right = tree.children_left, tree.children_right
+    internal, ranges, leaves = [], [], []
+    # Iterative preorder; ("exit", node) closes the left-subtree range of node
+    stack = [("visit", 0)]
+    starts = {}
+    while stack:
+        action, node = stack.pop()
+        if action == "exit":
+            ranges[starts[node]][1] = len(leaves)
+            continue
+        if left[node] == -1:
+            leaves.append(node)
+            continue
+        starts[node] = len(internal)
+        internal.append(node)
+        ranges.append([len(leaves), None])
+        stack.extend([("visit", right[node]), ("exit", node), ("visit", left[node])])
+    return internal, ranges, leaves
+
+
+def _bitmask_trees(trees, leaf_values):
+    """
+    Encode shallow trees (at most 64 leaves) for bitmask evaluation.
+
+    Each internal node gets a mask with the bits of its left-subtree leaves
+    cleared. A row's exit leaf in a tree is the lowest bit left after ANDing
+    the masks of every node whose test sends it right, so all trees are
+    scored with one vectorized pass per node slot instead of a walk. Arrays
+    are (node slot, tree) so each slot's row is contiguous; trees with fewer
+    nodes are padded with neutral all-ones masks.
+    """
+    shapes = [_leaf_ranges(tree) for tree in trees]
+    n_slots = max(len(internal) for internal, _, _ in shapes)
+    n_leaves = max(len(leaves) for _, _, leaves in shapes)
+    mask_dtype = next(dt for dt in (np.uint8, np.uint16, np.uint32, np.uint64) if n_leaves <= np.iinfo(dt).bits)
+    all_ones = np.iinfo(mask_dtype).max
+
+    feature = np.zeros((n_slots, len(trees)), dtype=np.int64)
+    threshold = np.full((n_slots, len(trees)), np.inf)
+    mask = np.full((n_slots, len(trees)), all_ones, dtype=mask_dtype)
+    value = np.zeros((len(trees), n_leaves))
+    for t, (tree, leaf_value, (internal, ranges, leaves)) in enumerate(zip(trees, leaf_values, shapes)):
+        for slot, (node, (first, stop)) in enumerate(zip(internal, ranges)):
+            feature[slot, t] = tree.feature[node]
+            threshold[slot, t] = tree.threshold[node]
+            cleared = ((1 << (stop - first)) - 1) << first
+            mask[slot, t] = all_ones & ~cleared
+        value[t, :len(leaves)] = leaf_value[leaves]
+    return {
+        "node_feature": feature,
+        "node_threshold": _float32_floor(threshold),
+        "node_mask": mask,
+        "leaf_value": value,
+    }
+
+
+def _export_trees(trees, leaf_values):
+    """Pick the bitmask layout for shallow trees and the node walk otherwise."""
+    if max(tree.n_leaves for tree in trees) <= _MAX_BITMASK_LEAVES:
+        return "bitmask", _bitmask_trees(trees, leaf_values)
+    return "walk", _flatten_trees(trees, leaf_values)
+
+
+def export_pipeline(model, scaler, feature_names):
+    """
+    Convert a fitted scaler and binary classifier into (meta, arrays).
+
+    Raises:
+        ValueError: If the estimator type or configuration is unsupported.
+    """
+    kind = type(model).__name__
+    if len(getattr(model, "classes_", [])) != 2:
+        raise ValueError(f"Only binary classifiers are supported, got {kind}")
+
+    n_features = len(feature_names)
+    mean, scale = _export_scaler(scaler, n_features)
+    meta = {"format_version": FORMAT_VERSION, "kind": kind, "feature_names": list(feature_names)}
+    arrays = {"scaler_mean": mean, "scaler_scale": scale}
+
+    if kind == "LogisticRegression":
+        arrays["coef"] = np.asarray(model.coef_[0], dtype=np.float64)
+        meta["intercept"] = float(model.intercept_[0])
+
+    elif kind == "SVC":
+        if not model.probability:
+            raise ValueError("SVC must be fitted with probability=True")
+        if model.kernel not in ("rbf", "linear"):
+            raise ValueError(f"Unsupported SVC kernel: {model.kernel}")
+        arrays["support_vectors"] = np.asarray(model.support_vectors_, dtype=np.float64)
+        arrays["dual_coef"] = np.asarray(model.dual_coef_[0], dtype=np.float64)
+        meta.update({
+            "kernel": model.kernel,
+            "gamma": float(model._gamma),
+            "intercept": float(model.intercept_[0]),
+            "prob_a": float(model.probA_[0]),
+            "prob_b": float(model.probB_[0]),
+        })
+
+    elif kind == "RandomForestClassifier":
+        trees = [est.tree_ for est in model.estimators_]
+        leaf_values = []
+        for tree in trees:
+            counts = tree.value[:, 0, :]
+            leaf_values.append(counts[:, 1] / counts.sum(axis=1))
+        layout, tree_arrays = _export_trees(trees, leaf_values)
+        arrays.update(tree_arrays)
+        meta.update({"tree_layout": layout, "max_depth": max(int(tree.max_depth) for tree in trees)})
+
+    elif kind == "GradientBoostingClassifier":
+        trees = [est.tree_ for est in model.estimators_[:, 0]]
+        leaf_values = [tree.value[:, 0, 0] for tree in trees]
+        layout, tree_arrays = _export_trees(trees, leaf_values)
+        arrays.update(tree_arrays)
+        meta.update({
+            "tree_layout": layout,
+            "max_depth": max(int(tree.max_depth) for tree in trees),
+            "learning_rate": float(model.learning_rate),
+            "init_raw": float(model._raw_predict_init(np.zeros((1, n_features)))[0, 0]),
+        })
+
+    else:
+        raise ValueError(f"Unsupported estimator: {kind}")
+
+    return meta, arrays
+
+
+def save_compiled(path, meta, arrays):
+    """Write meta.json plus one uncompressed .npy per array into a directory."""
+    os.makedirs(path, exist_ok=True)
+    # Drop arrays left over from an export in another layout
+    for filename in os.listdir(path):
+        if filename.endswith(".npy") and filename[:-4] not in arrays:
+            os.remove(os.path.join(path, filename))
+    for key, array in arrays.items():
+        np.save(os.path.join(path, f"{key}.npy"), np.ascontiguousarray(array))
+    meta = dict(meta, arrays=sorted(arrays))
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+# ─────────────── Evaluation (NumPy only) ─────────────── #
+# Rows scored per pass of the tree walk; keeps the (rows x trees) index arrays cache-resident
+_TREE_BLOCK_ROWS = 256
+# Rows per bitmask block; keeps the (trees x rows) scratch buffers near L2 size
+_BITMASK_BLOCK_ROWS = 128
+
+
+def _walk_trees(arrays, max_depth, X):
+    """Return the leaf value reached in every tree, shape (n_samples, n_trees)."""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    n_samples, n_features = X.shape
+    roots, children = arrays["roots"], arrays["children"]
+    feature, threshold = arrays["feature"], arrays["threshold"]
+    n_trees = roots.shape[0]
+    leaves = np.empty((n_samples, n_trees))
+    for start in range(0, n_samples, _TREE_BLOCK_ROWS):
+        block = X[start:start + _TREE_BLOCK_ROWS]
+        n_rows = block.shape[0]
+        flat = block.ravel()
+        # One (row, tree) pair per slot; leaves loop back to themselves
+        nodes = np.tile(roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, n_trees)
+        for _ in range(max_depth):
+            go_left = flat.take(row_offset + feature.take(nodes)) <= threshold.take(nodes)
+            nodes = children.take(2 * nodes + go_left)
+        leaves[start:start + n_rows] = arrays["value"].take(nodes).reshape(n_rows, n_trees)
+    return leaves
+
+
+def _score_bitmask_trees(arrays, X):
+    """Bitmask counterpart of _walk_trees, vectorized across all trees at once."""
+    # Feature-major rows make each node slot's gather a copy of whole rows
+    X = np.ascontiguousarray(np.asarray(X, dtype=np.float32).T)
+    n_samples = X.shape[1]
+    feature, threshold, mask = arrays["node_feature"], arrays["node_threshold"], arrays["node_mask"]
+    n_trees, n_leaves = arrays["leaf_value"].shape
+    flat_value = arrays["leaf_value"].ravel()
+    # As a float32, 2**k has biased exponent k + 127; fold the bias into each tree's offset
+    offset = (np.arange(n_trees, dtype=np.int64) * n_leaves - 127)[:, None]
+    leaves = np.empty((n_trees, n_samples))
+    # Scratch buffers reused by every block: fresh (trees x rows) temporaries cost more than the math
+    shape = (n_trees, min(_BITMASK_BLOCK_ROWS, n_samples))
+    gathered = np.empty(shape, dtype=np.float32)
+    go_left = np.empty(shape, dtype=bool)
+    term = np.empty(shape, dtype=mask.dtype)
+    exits = np.empty(shape, dtype=mask.dtype)
+    leaf = np.empty(shape, dtype=np.int64)
+    for start in range(0, n_samples, _BITMASK_BLOCK_ROWS):
+        block = X[:, start:start + _BITMASK_BLOCK_ROWS]
+        n_rows = block.shape[1]
+        block_gathered, block_go_left = gathered[:, :n_rows], go_left[:, :n_rows]
+        block_term, block_exits = term[:, :n_rows], exits[:, :n_rows]
+        block_exits.fill(np.iinfo(mask.dtype).max)
+        for slot in range(feature.shape[0]):
+            # mode="clip" lets take write into out without an extra buffer; indices are valid anyway
+            np.take(block, feature[slot], axis=0, out=block_gathered, mode="clip")
+            np.less_equal(block_gathered, threshold[slot][:, None], out=block_go_left)
+            # All ones where the row goes left, the node's mask where it goes right
+            np.negative(block_go_left.view(np.uint8), out=block_term, dtype=mask.dtype)
+            block_term |= mask[slot][:, None]
+            block_exits &= block_term
+        # Isolate the lowest set bit, then read its index from the float32 exponent
+        np.negative(block_exits, out=block_term)
+        block_term &= block_exits
+        exponent = block_term.astype(np.float32).view(np.int32)
+        exponent >>= 23
+        np.add(exponent, offset, out=leaf[:, :n_rows])
+        np.take(flat_value, leaf[:, :n_rows], out=leaves[:, start:start + n_rows], mode="clip")
+    return leaves.T
+
+
+def _svm_couple(r):
+    """
+    libsvm's iterative pairwise coupling for two classes.
+
+    Returns the probability of the first class; reproduces libsvm's stopping
+    rule so results match SVC.predict_proba rather than the closed form.
+    """
+    k = 2
+    eps = 0.005 / k
+    q00 = (1 - r) ** 2
+    q11 = r ** 2
+    q01 = -r * (1 - r)
+    p0 = np.full_like(r, 1.0 / k)
+    p1 = np.full_like(r, 1.0 / k)
+    active = np.ones_like(r, dtype=bool)
+    for _ in range(max(100, k)):
+        qp0 = q00 * p0 + q01 * p1
+        qp1 = q01 * p0 + q11 * p1
+        pqp = p0 * qp0 + p1 * qp1
+        max_error = np.maximum(np.abs(qp0 - pqp), np.abs(qp1 - pqp))
+        active &= max_error >= eps
+        if not active.any():
+            break
+        # t = 0
+        diff = (-qp0 + pqp) / q00
+        new_p0 = p0 + diff
+        pqp_n = (pqp + diff * (diff * q00 + 2 * qp0)) / (1 + diff) / (1 + diff)
+        qp1_n = (qp1 + diff * q01) / (1 + diff)
+        new_p0, new_p1 = new_p0 / (1 + diff), p1 / (1 + diff)
+        # t = 1
+        diff = (-qp1_n + pqp_n) / q11
+        new_p1 = new_p1 + diff
+        new_p0, new_p1 = new_p0 / (1 + diff), new_p1 / (1 + diff)
+        p0 = np.where(active, new_p0, p0)
+        p1 = np.where(active, new_p1, p1)
+    return p0
+
+
+class CompiledModel:
+    """Evaluates an exported pipeline with NumPy; mirrors sklearn's predict_proba."""
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.kind = meta["kind"]
+        self.feature_names = meta["feature_names"]
+        self.arrays = arrays
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """
+        Load an exported directory written by save_compiled.
+
+        With mmap_mode="r" the arrays are mapped read-only instead of copied,
+        so every process that loads the same directory shares the pages.
+        """
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled format in {path}")
+        # np.asarray drops the memmap subclass (cheaper ufuncs) but keeps the mapping
+        arrays = {
+            key: np.asarray(np.load(os.path.join(path, f"{key}.npy"), mmap_mode=mmap_mode))
+            for key in meta["arrays"]
+        }
+        return cls(meta, arrays)
+
+    def positive_proba(self, X):
+        """Return P(class 1) for each row of unscaled X."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        X = (X - self.arrays["scaler_mean"]) / self.arrays["scaler_scale"]
+        meta, arrays = self.meta, self.arrays
+
+        if self.kind == "LogisticRegression":
+            return 1.0 / (1.0 + np.exp(-(X @ arrays["coef"] + meta["intercept"])))
+
+        if self.kind == "SVC":
+            sv = arrays["support_vectors"]
+            if meta["kernel"] == "rbf":
+                sq_dist = (X ** 2).sum(axis=1)[:, None] + (sv ** 2).sum(axis=1)[None, :] - 2 * X @ sv.T
+                kernel = np.exp(-meta["gamma"] * sq_dist)
+            else:
+                kernel = X @ sv.T
+            decision = kernel @ arrays["dual_coef"] + meta["intercept"]
+            # libsvm works with the negated binary decision value
+            f_apb = -decision * meta["prob_a"] + meta["prob_b"]
+            r = np.clip(1.0 / (1.0 + np.exp(f_apb)), _SVM_MIN_PROB, 1 - _SVM_MIN_PROB)
+            return 1.0 - _svm_couple(r)
+
+        if meta["tree_layout"] == "bitmask":
+            leaves = _score_bitmask_trees(arrays, X)
+        else:
+            leaves = _walk_trees(arrays, meta["max_depth"], X)
+        if self.kind == "RandomForestClassifier":
+            return leaves.mean(axis=1)
+        raw = meta["init_raw"] + meta["learning_rate"] * leaves.sum(axis=1)
+        return 1.0 / (1.0 + np.exp(-raw))
+
+    def predict_proba(self, X):
+        """Return an (n_samples, 2) probability matrix like sklearn classifiers."""
+        positive = self.positive_proba(X)
+        return np.column_stack([1.0 - positive, positive])
+
+
+def compiled_path(name):
+    return os.path.join(COMPILED_DIR, name)
+
+
+def export_files(name, model_path, scaler_path, out_dir):
+    """
+    Export a .sav model/scaler pair to out_dir and verify it against sklearn.
+
+    Returns:
+        Largest absolute probability difference on random probe points
+    """
+    import joblib
+    from backend.inference import MODEL_SPECS
+
+    feature_names = MODEL_SPECS[name]["feature_names"]
+    model = joblib.load(model_path)
+    scaler = joblib.load(scaler_path) if scaler_path and os.path.exists(scaler_path) else None
+    meta, arrays = export_pipeline(model, scaler, feature_names)
+    meta["source"] = {
+        "model_sha256": file_sha256(model_path),
+        "scaler_sha256": file_sha256(scaler_path) if scaler is not None else None,
+    }
+    save_compiled(out_dir, meta, arrays)
+
+    # Check against sklearn on points spread around the training distribution
+    compiled = CompiledModel.load(out_dir)
+    rng = np.random.default_rng(0)
+    mean, scale = arrays["scaler_mean"], arrays["scaler_scale"]
+    X = mean + scale * rng.standard_normal((500, len(mean)))
+    expected = model.predict_proba(scaler.transform(X) if scaler is not None else X)[:, 1]
+    return float(np.max(np.abs(compiled.positive_proba(X) - expected)))
+
+
+def export_all():
+    """Export every built-in model in MODEL_SPECS to backend/compiled/."""
+    from backend.inference import MODEL_SPECS
+
+    for name, spec in MODEL_SPECS.items():
+        max_error = export_files(name, spec["model_path"], spec["scaler_path"], compiled_path(name))
+        print(f"Exported {name} -> {compiled_path(name)}  max |diff| = {max_error:.2e}")
+
+if __name__ == "__main__":
+    import warnings
+    warnings.filterwarnings("ignore", category=UserWarning)
+    export_all()
@@ -1,15 +1,135 @@
 import sqlite3
 import os
 import json
+import re
+import queue
+import threading
+import time
+import atexit
+import sys
+from collections import OrderedDict
+from datetime import datetime
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "data", "users.db")
+# Make the `backend` package importable when run as `python backend/database.py`
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
-def get_db_connection():
-    """Returns a connection to the SQLite database."""
-    conn = sqlite3.connect(DB_PATH)
+from backend.metrics import DB_QUERY_SECONDS
+
+# Overridable so load tests and tooling can run against a throwaway database
+DB_PATH = os.getenv("DB_PATH", os.path.join(os.path.dirname(__file__), "data", "users.db"))
+
+# Connection tuning (overridable per deployment)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHED_STATEMENTS = int(os.getenv("DB_CACHED_STATEMENTS", "256"))
+
+def _connect():
+    """Open a new tuned connection: WAL, relaxed fsync, busy timeout, mmap reads."""
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        cached_statements=DB_CACHED_STATEMENTS
+    )
     conn.row_factory = sqlite3.Row
+    # WAL lets readers proceed while one writer commits; NORMAL is durable in WAL mode
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
     return conn
 
+class _PooledConnection:
+    """
+    Wraps a pooled sqlite3 connection so existing `conn.close()` calls
+    hand it back to the pool instead of closing it.
+
+    Also usable as `with get_db_connection() as conn:`, which commits on
+    success, rolls back on error and then returns the connection to the pool
+    (sqlite3's own context manager commits but never closes).
+    """
+    def __init__(self, pool, conn):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_conn", conn)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def close(self):
+        conn = self._conn
+        if conn is not None:
+            object.__setattr__(self, "_conn", None)
+            self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._conn is None:
+            # Already closed inside the block
+            return False
+        try:
+            if exc_type is None:
+                self._conn.commit()
+            else:
+                self._conn.rollback()
+        finally:
+            self.close()
+        return False
+
+class ConnectionPool:
+    """Per-process pool of idle connections; never blocks, caps idle connections at size."""
+    def __init__(self, size):
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _reset_after_fork(self):
+        # Connections must not be shared with a parent process
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle = queue.LifoQueue(maxsize=self.size)
+                self._pid = os.getpid()
+
+    def acquire(self):
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = _connect()
+        conn.row_factory = sqlite3.Row
+        return _PooledConnection(self, conn)
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+_pool = ConnectionPool(DB_POOL_SIZE)
+
+def get_db_connection():
+    """Returns a pooled connection to the SQLite database; close() returns it to the pool."""
+    return _pool.acquire()
+
 def init_db():
     """Initializes the database with the users table."""
     # Ensure the data directory exists
@@ -23,6 +143,7 @@ def init_db():
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             email TEXT UNIQUE NOT NULL,
+            email_canonical TEXT,
             password TEXT NOT NULL,
             fullname TEXT NOT NULL,
             is_admin INTEGER DEFAULT 0
@@ -50,56 +171,462 @@ def init_db():
     ''')
     
     conn.commit()
+    _run_migrations(conn)
     conn.close()
     print(f"Database initialized at {DB_PATH}")
 
-def log_prediction(email, prediction_type, inputs, outcome):
+def canonical_email(email):
+    """Canonical form used for lookups: trimmed and lowercased."""
+    return email.strip().lower()
+
+# ─────────────── Schema Migrations ─────────────── #
+# Applied in order; PRAGMA user_version records how many have run.
+
+def _migration_canonical_email_and_indexes(cursor):
+    """Index a canonical email column and the prediction access paths."""
+    try:
+        cursor.execute('ALTER TABLE users ADD COLUMN email_canonical TEXT')
+    except sqlite3.OperationalError:
+        # Column already exists
+        pass
+    cursor.execute("UPDATE users SET email_canonical = LOWER(TRIM(email)) WHERE email_canonical IS NULL")
+    try:
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email_canonical ON users(email_canonical)")
+    except sqlite3.IntegrityError:
+        # Legacy rows differing only in case; keep them but still index lookups
+        print("WARNING: duplicate emails differ only by case; email_canonical index is not unique")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_email_canonical ON users(email_canonical)")
+
+    # Keep the column filled for writers that only set `email` (e.g. scripts/create_admin.py)
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_email_canonical_insert
+        AFTER INSERT ON users WHEN NEW.email_canonical IS NULL
+        BEGIN
+            UPDATE users SET email_canonical = LOWER(TRIM(NEW.email)) WHERE id = NEW.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_email_canonical_update
+        AFTER UPDATE OF email ON users
+        BEGIN
+            UPDATE users SET email_canonical = LOWER(TRIM(NEW.email)) WHERE id = NEW.id;
+        END
+    ''')
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_predictions_user_ts ON predictions(user_id, timestamp DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_predictions_type_ts ON predictions(type, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_predictions_ts ON predictions(timestamp)")
+
+# Number of latest predictions kept in the recent_predictions ring
+RECENT_PREDICTIONS_RING = 10
+
+def _migration_stats_rollups(cursor):
+    """
+    Rollup tables for /api/admin/stats, kept current by triggers so every
+    writer (API, Streamlit apps, scripts) maintains them in the same transaction.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS prediction_type_counts (
+            type TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS prediction_daily_counts (
+            day TEXT NOT NULL,
+            type TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, type)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recent_predictions (
+            prediction_id INTEGER PRIMARY KEY
+        )
+    ''')
+
+    # Backfill from existing history (one-time full scan)
+    cursor.execute("DELETE FROM stats_counters")
+    cursor.execute("INSERT INTO stats_counters (name, value) SELECT 'users', COUNT(*) FROM users")
+    cursor.execute("DELETE FROM prediction_type_counts")
+    cursor.execute("INSERT INTO prediction_type_counts (type, count) SELECT type, COUNT(*) FROM predictions GROUP BY type")
+    cursor.execute("DELETE FROM prediction_daily_counts")
+    cursor.execute('''
+        INSERT INTO prediction_daily_counts (day, type, count)
+        SELECT DATE(timestamp), type, COUNT(*) FROM predictions GROUP BY DATE(timestamp), type
+    ''')
+    cursor.execute("DELETE FROM recent_predictions")
+    cursor.execute(f'''
+        INSERT INTO recent_predictions (prediction_id)
+        SELECT id FROM predictions ORDER BY id DESC LIMIT {RECENT_PREDICTIONS_RING}
+    ''')
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_count_insert AFTER INSERT ON users
+        BEGIN
+            UPDATE stats_counters SET value = value + 1 WHERE name = 'users';
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_count_delete AFTER DELETE ON users
+        BEGIN
+            UPDATE stats_counters SET value = value - 1 WHERE name = 'users';
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_predictions_rollup_insert AFTER INSERT ON predictions
+        BEGIN
+            INSERT INTO prediction_type_counts (type, count) VALUES (NEW.type, 1)
+                ON CONFLICT(type) DO UPDATE SET count = count + 1;
+            INSERT INTO prediction_daily_counts (day, type, count) VALUES (DATE(NEW.timestamp), NEW.type, 1)
+                ON CONFLICT(day, type) DO UPDATE SET count = count + 1;
+            INSERT INTO recent_predictions (prediction_id) VALUES (NEW.id);
+            DELETE FROM recent_predictions WHERE prediction_id NOT IN (
+                SELECT prediction_id FROM recent_predictions
+                ORDER BY prediction_id DESC LIMIT {RECENT_PREDICTIONS_RING}
+            );
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_predictions_rollup_delete AFTER DELETE ON predictions
+        BEGIN
+            UPDATE prediction_type_counts SET count = count - 1 WHERE type = OLD.type;
+            UPDATE prediction_daily_counts SET count = count - 1
+                WHERE day = DATE(OLD.timestamp) AND type = OLD.type;
+            DELETE FROM recent_predictions WHERE prediction_id = OLD.id;
+        END
+    ''')
+
+# Outcome strings written by the assessment pages look like "75.0% Risk"
+_RISK_PCT_PATTERN = re.compile(r"(\d+\.?\d*)%")
+
+def parse_risk_pct(outcome):
+    """Extract the numeric risk from an outcome string, or None if it has none."""
+    match = _RISK_PCT_PATTERN.search(outcome or "")
+    return float(match.group(1)) if match else None
+
+def _migration_numeric_risk(cursor):
+    """
+    Store risk, model version and inference latency as columns so wellness and
+    trend queries are indexed SQL aggregates rather than regex over outcomes.
+    """
+    for column, column_type in (("risk_pct", "REAL"), ("model_version", "TEXT"), ("latency_ms", "REAL")):
+        try:
+            cursor.execute(f"ALTER TABLE predictions ADD COLUMN {column} {column_type}")
+        except sqlite3.OperationalError:
+            # Column already exists
+            pass
+
+    # Backfill from the outcome text of existing rows
+    cursor.execute("SELECT id, outcome FROM predictions WHERE risk_pct IS NULL AND INSTR(outcome, '%') > 0")
+    updates = []
+    for row in cursor.fetchall():
+        risk_pct = parse_risk_pct(row["outcome"])
+        if risk_pct is not None:
+            updates.append((risk_pct, row["id"]))
+    cursor.executemany("UPDATE predictions SET risk_pct = ? WHERE id = ?", updates)
+
+    # Latest result per (user, type) is a single index seek
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_predictions_user_type_ts ON predictions(user_id, type, timestamp DESC)")
+
+def _migration_history_keyset_index(cursor):
+    """
+    Index the (timestamp, id) keyset used to page through a user's history.
+    It supersedes idx_predictions_user_ts, which could not break timestamp ties.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_predictions_user_ts_id ON predictions(user_id, timestamp DESC, id DESC)")
+    cursor.execute("DROP INDEX IF EXISTS idx_predictions_user_ts")
+
+def _migration_recent_ring_refill(cursor):
+    """
+    Refill the recent_predictions ring when one of its rows is deleted, so it
+    always holds the latest RECENT_PREDICTIONS_RING ids (fewer only if the
+    table is that small). Rings already shortened by deletes are rebuilt.
+    """
+    cursor.execute("DROP TRIGGER IF EXISTS trg_predictions_rollup_delete")
+    cursor.execute(f'''
+        CREATE TRIGGER trg_predictions_rollup_delete AFTER DELETE ON predictions
+        BEGIN
+            UPDATE prediction_type_counts SET count = count - 1 WHERE type = OLD.type;
+            UPDATE prediction_daily_counts SET count = count - 1
+                WHERE day = DATE(OLD.timestamp) AND type = OLD.type;
+            DELETE FROM recent_predictions WHERE prediction_id = OLD.id;
+            -- Top ids by primary key: a no-op unless the deleted row was in the ring
+            INSERT OR IGNORE INTO recent_predictions (prediction_id)
+                SELECT id FROM predictions ORDER BY id DESC LIMIT {RECENT_PREDICTIONS_RING};
+        END
+    ''')
+    cursor.execute("DELETE FROM recent_predictions")
+    cursor.execute(f'''
+        INSERT INTO recent_predictions (prediction_id)
+        SELECT id FROM predictions ORDER BY id DESC LIMIT {RECENT_PREDICTIONS_RING}
+    ''')
+
+def _migration_latest_by_type_index(cursor):
+    """
+    Index the (timestamp, id) order used to pick each type's latest prediction.
+    It supersedes idx_predictions_user_type_ts, which could not break timestamp ties.
+    """
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_predictions_user_type_ts_id ON predictions(user_id, type, timestamp DESC, id DESC)"
+    )
+    cursor.execute("DROP INDEX IF EXISTS idx_predictions_user_type_ts")
+
+SCHEMA_MIGRATIONS = [
+    _migration_canonical_email_and_indexes,
+    _migration_stats_rollups,
+    _migration_numeric_risk,
+    _migration_history_keyset_index,
+    _migration_recent_ring_refill,
+    _migration_latest_by_type_index,
+]
+
+def _run_migrations(conn):
+    """Apply pending schema migrations, each in its own transaction."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target, migration in enumerate(SCHEMA_MIGRATIONS, start=1):
+        if version >= target:
+            continue
+        cursor = conn.cursor()
+        try:
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"Applied database migration {target}: {migration.__name__}")
+    # Refresh planner statistics where they are stale (cheap when nothing changed)
+    conn.execute("PRAGMA optimize")
+
+# ─────────────── Prediction Logging ─────────────── #
+# log_prediction only enqueues; a background thread resolves user ids and
+# commits events in batched transactions every LOG_FLUSH_INTERVAL_MS or
+# LOG_BATCH_MAX_ROWS rows, whichever comes first.
+PREDICTION_LOG_ASYNC = os.getenv("PREDICTION_LOG_ASYNC", "1") != "0"
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+LOG_BATCH_MAX_ROWS = int(os.getenv("LOG_BATCH_MAX_ROWS", "500"))
+LOG_FLUSH_INTERVAL_MS = int(os.getenv("LOG_FLUSH_INTERVAL_MS", "50"))
+USER_ID_CACHE_SIZE = int(os.getenv("USER_ID_CACHE_SIZE", "10000"))
+
+def _utc_timestamp():
+    # Same format as SQLite's CURRENT_TIMESTAMP, captured when the event happens
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+@DB_QUERY_SECONDS.time(operation="log_write")
+def _write_predictions(conn, events, user_ids=None):
+    """
+    Insert prediction events in a single transaction.
+    Each event is a dict with email, type, inputs, outcome and timestamp.
+    """
+    user_ids = user_ids if user_ids is not None else {}
+    cursor = conn.cursor()
+
+    unresolved = {e["email"] for e in events if e["email"] and e["email"] not in user_ids}
+    if unresolved:
+        placeholders = ",".join("?" * len(unresolved))
+        cursor.execute(
+            f"SELECT id, email_canonical FROM users WHERE email_canonical IN ({placeholders})",
+            tuple(unresolved)
+        )
+        for row in cursor.fetchall():
+            user_ids[row["email_canonical"]] = row["id"]
+
+    rows = []
+    for e in events:
+        inputs = e["inputs"]
+        # log_prediction serializes inputs up front; this covers events built elsewhere
+        if not isinstance(inputs, str):
+            try:
+                inputs = json.dumps(inputs)
+            except (TypeError, ValueError) as err:
+                print(f"Database Error in prediction log: skipping event with unserializable inputs: {err}")
+                continue
+        user_id = user_ids.get(e["email"]) if e["email"] else None
+        if e["email"] and user_id is None:
+            print(f"DEBUG: No user found for normalized email: {e['email']}") # Visible in server console
+        rows.append((
+            user_id, e["type"], inputs, e["outcome"], e["timestamp"],
+            e.get("risk_pct"), e.get("model_version"), e.get("latency_ms")
+        ))
+
+    cursor.executemany('''
+        INSERT INTO predictions (user_id, type, inputs, outcome, timestamp, risk_pct, model_version, latency_ms)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+
+class PredictionLogWriter:
+    """Bounded queue plus one writer thread that commits prediction events in batches."""
+
+    def __init__(self, max_queue=LOG_QUEUE_MAX, batch_rows=LOG_BATCH_MAX_ROWS,
+                 flush_interval_ms=LOG_FLUSH_INTERVAL_MS, user_cache_size=USER_ID_CACHE_SIZE):
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval_ms / 1000
+        self.user_cache_size = user_cache_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._user_ids = OrderedDict()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="prediction-log-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, event):
+        """Enqueue an event; returns False if the queue is full."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                # Only positive lookups are cached: an unknown email may register later
+                known = {e["email"]: self._user_ids[e["email"]] for e in batch if e["email"] in self._user_ids}
+                conn = get_db_connection()
+                try:
+                    _write_predictions(conn, batch, known)
+                finally:
+                    conn.close()
+                for email, user_id in known.items():
+                    self._user_ids[email] = user_id
+                    self._user_ids.move_to_end(email)
+                while len(self._user_ids) > self.user_cache_size:
+                    self._user_ids.popitem(last=False)
+            except Exception as e:
+                print(f"Database Error in prediction log writer, retrying {len(batch)} events one by one: {e}")
+                self._write_individually(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_individually(self, batch):
+        """Commit each event on its own so one bad event does not discard the rest."""
+        lost = 0
+        for event in batch:
+            try:
+                conn = get_db_connection()
+                try:
+                    _write_predictions(conn, [event])
+                finally:
+                    conn.close()
+            except Exception as e:
+                lost += 1
+                print(f"Database Error in prediction log writer (event for {event['email'] or 'guest'} lost): {e}")
+        if lost:
+            print(f"Prediction log writer: {lost} of {len(batch)} events lost")
+
+    def flush(self):
+        """Block until every queued event has been committed."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+_log_writer = PredictionLogWriter()
+atexit.register(_log_writer.flush)
+
+def flush_prediction_log():
+    """Commit all pending prediction events (call on shutdown)."""
+    _log_writer.flush()
+
+def log_prediction(email, prediction_type, inputs, outcome, risk_pct=None, model_version=None, latency_ms=None):
     """
     Logs a prediction result to the database.
     Inputs is expected to be a JSON-serializable dict or list, or a string.
+    risk_pct is parsed from the outcome (e.g. "75.0% Risk") when not given.
+    The write happens on a background thread; if its queue is full, the
+    event is written synchronously instead of being dropped.
+
+    Raises:
+        TypeError: If inputs cannot be serialized to JSON (e.g. numpy scalars).
     """
+    # Serialize here so a bad payload fails for its caller, not inside a shared batch
+    if not isinstance(inputs, str):
+        inputs = json.dumps(inputs)
+    if risk_pct is None:
+        risk_pct = parse_risk_pct(outcome)
+    if email:
+        email = canonical_email(email)
+    else:
+        print("DEBUG: No email provided to log_prediction")
+    event = {
+        "email": email or None,
+        "type": prediction_type,
+        "inputs": inputs,
+        "outcome": outcome,
+        "timestamp": _utc_timestamp(),
+        "risk_pct": risk_pct,
+        "model_version": model_version,
+        "latency_ms": latency_ms
+    }
+    if PREDICTION_LOG_ASYNC and _log_writer.submit(event):
+        return
+
     conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
     try:
-        user_id = None
-        if email:
-            email = email.strip().lower()
-            cursor.execute("SELECT id FROM users WHERE LOWER(email) = ?", (email,))
-            row = cursor.fetchone()
-            if row:
-                user_id = row['id']
-            else:
-                print(f"DEBUG: No user found for normalized email: {email}") # Visible in server console
-        else:
-            print("DEBUG: No email provided to log_prediction")
-        
-        # Ensure inputs is a string
-        if not isinstance(inputs, str):
-            inputs = json.dumps(inputs)
-            
-        cursor.execute('''
-            INSERT INTO predictions (user_id, type, inputs, outcome)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, prediction_type, inputs, outcome))
-        conn.commit()
+        _write_predictions(conn, [event])
     except Exception as e:
         print(f"Database Error in log_prediction: {e}")
     finally:
         conn.close()
 
-def get_user_predictions(email):
-    """Retrieves all predictions for a specific user email."""
+@DB_QUERY_SECONDS.time(operation="get_user_predictions")
+def get_user_predictions(user_id, limit=None, before=None):
+    """
+    Retrieves a user's predictions, newest first.
+
+    Args:
+        user_id: users.id of the owner
+        limit: Maximum number of rows to return (all rows if None)
+        before: (timestamp, id) keyset of the last row already seen; only
+            older rows are returned
+    """
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        email = email.strip().lower()
-        cursor.execute("""
+        params = [user_id]
+        keyset = ""
+        if before is not None:
+            keyset = "AND (p.timestamp, p.id) < (?, ?)"
+            params.extend(before)
+        page = ""
+        if limit is not None:
+            page = "LIMIT ?"
+            params.append(limit)
+        # Served by idx_predictions_user_ts_id (range seek, no sort step)
+        cursor.execute(f"""
             SELECT p.* FROM predictions p 
-            JOIN users u ON p.user_id = u.id 
-            WHERE LOWER(u.email) = ? 
-            ORDER BY timestamp DESC
-        """, (email,))
+            WHERE p.user_id = ? {keyset}
+            ORDER BY p.timestamp DESC, p.id DESC
+            {page}
+        """, params)
         return [dict(row) for row in cursor.fetchall()]
     except Exception as e:
         print(f"Database Error in get_user_predictions: {e}")
@@ -107,5 +634,59 @@ def get_user_predictions(email):
     finally:
         conn.close()
 
+# Assessments that contribute to the wellness score
+ASSESSMENT_TYPES = ("Heart Disease", "Diabetes", "Parkinson's")
+
+@DB_QUERY_SECONDS.time(operation="get_wellness_score")
+def get_wellness_score(user_id):
+    """
+    Wellness score for a user (by users.id): 100 minus the mean of the latest
+    risk of each assessment type, where a missing assessment counts as zero risk.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        types = " UNION ALL ".join("SELECT ? AS type" for _ in ASSESSMENT_TYPES)
+        # One idx_predictions_user_type_ts_id seek per assessment type; the id
+        # tiebreak picks the last of several rows logged in the same second
+        cursor.execute(f"""
+            SELECT ROUND(AVG(100 - IFNULL((
+                SELECT p.risk_pct FROM predictions p
+                WHERE p.user_id = ? AND p.type = t.type
+                ORDER BY p.timestamp DESC, p.id DESC LIMIT 1
+            ), 0)), 1) AS wellness_score
+            FROM ({types}) t
+        """, (user_id, *ASSESSMENT_TYPES))
+        return cursor.fetchone()["wellness_score"]
+    except Exception as e:
+        print(f"Database Error in get_wellness_score: {e}")
+        return 100.0
+    finally:
+        conn.close()
+
+@DB_QUERY_SECONDS.time(operation="get_latest_predictions")
+def get_latest_predictions(user_id):
+    """Latest prediction of each assessment type for a user (by users.id), keyed by type."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        types = " UNION ALL ".join("SELECT ? AS type" for _ in ASSESSMENT_TYPES)
+        # One idx_predictions_user_type_ts_id seek per assessment type
+        cursor.execute(f"""
+            SELECT p.type, p.outcome, p.risk_pct, p.timestamp
+            FROM ({types}) t
+            JOIN predictions p ON p.id = (
+                SELECT id FROM predictions
+                WHERE user_id = ? AND type = t.type
+                ORDER BY timestamp DESC, id DESC LIMIT 1
+            )
+        """, (*ASSESSMENT_TYPES, user_id))
+        return {row["type"]: dict(row) for row in cursor.fetchall()}
+    except Exception as e:
+        print(f"Database Error in get_latest_predictions: {e}")
+        return {}
+    finally:
+        conn.close()
+
 if __name__ == "__main__":
     init_db()
@@ -0,0 +1,237 @@
+"""
+Incremental export of logged predictions to Parquet for retraining.
+
+Rows of the predictions table newer than the checkpoint are read in id order,
+CHUNK rows at a time, and their JSON inputs are decoded into one typed float
+column per model feature (named as in MODEL_SPECS, i.e. as in the training
+CSVs). Each model gets its own dataset, partitioned by day:
+
+    backend/data/exports/heart/date=2026-03-01/chunk-000000012345-0.parquet
+
+The checkpoint (last exported id) is saved after every chunk, so an
+interrupted run resumes where it stopped. Files are named after the first id
+of their chunk, and files of chunks past the checkpoint (written by a run
+that died before saving it) are removed before exporting, so a resumed run
+never duplicates rows. Memory use is bounded by the chunk size, whatever the
+size of the table. Rows whose inputs are not a JSON object (entries logged
+before full features were recorded) are counted and skipped.
+
+Read an export back with:
+    pyarrow.dataset.dataset("backend/data/exports/heart", partitioning="hive")
+
+Usage:
+    python -m backend.export_parquet
+    python -m backend.export_parquet --full --chunk-rows 50000
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from backend.database import get_db_connection
+from backend.inference import MODEL_SPECS
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "exports"))
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "10000"))
+CHECKPOINT_NAME = "_checkpoint.json"
+_CHUNK_FILE = re.compile(r"^chunk-(\d+)-\d+\.parquet$")
+
+# predictions.type as logged by the Streamlit apps -> model key
+MODEL_BY_LABEL = {spec["label"]: name for name, spec in MODEL_SPECS.items()}
+
+_PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+def model_schema(name):
+    """Arrow schema of one model's dataset: prediction metadata, then one column per feature."""
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("user_id", pa.int64()),
+            ("timestamp", pa.timestamp("ms")),
+            ("date", pa.string()),
+            ("outcome", pa.string()),
+            ("risk_pct", pa.float64()),
+            ("model_version", pa.string()),
+            ("latency_ms", pa.float64()),
+        ]
+        + [(feature, pa.float64()) for feature in MODEL_SPECS[name]["feature_names"]]
+    )
+
+
+# ─────────────── Checkpoint ─────────────── #
+def read_checkpoint(export_dir=EXPORT_DIR):
+    try:
+        with open(os.path.join(export_dir, CHECKPOINT_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"last_id": 0, "rows": {name: 0 for name in MODEL_SPECS}, "skipped": 0}
+
+
+def _write_checkpoint(export_dir, checkpoint):
+    """Replace the checkpoint atomically so a crash never leaves a partial file."""
+    path = os.path.join(export_dir, CHECKPOINT_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _remove_uncommitted(export_dir, last_id):
+    """Delete chunk files written after the checkpoint was last saved."""
+    for name in MODEL_SPECS:
+        for root, _, files in os.walk(os.path.join(export_dir, name)):
+            for file_name in files:
+                match = _CHUNK_FILE.match(file_name)
+                if match and int(match.group(1)) > last_id:
+                    os.remove(os.path.join(root, file_name))
+
+
+# ─────────────── Decoding ─────────────── #
+def _as_float(value):
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _decode_chunk(rows):
+    """
+    Split a chunk of prediction rows into per-model column dicts.
+
+    Returns:
+        ({model: {column: [values]}}, number of rows skipped)
+    """
+    columns = {}
+    skipped = 0
+    for row in rows:
+        name = MODEL_BY_LABEL.get(row["type"])
+        try:
+            inputs = json.loads(row["inputs"]) if name else None
+        except (TypeError, ValueError):
+            inputs = None
+        if not isinstance(inputs, dict):
+            skipped += 1
+            continue
+        if name not in columns:
+            columns[name] = {field.name: [] for field in model_schema(name)}
+        cols = columns[name]
+        cols["id"].append(row["id"])
+        cols["user_id"].append(row["user_id"])
+        cols["timestamp"].append(row["timestamp"])
+        cols["date"].append((row["timestamp"] or "")[:10] or None)
+        cols["outcome"].append(row["outcome"])
+        cols["risk_pct"].append(row["risk_pct"])
+        cols["model_version"].append(row["model_version"])
+        cols["latency_ms"].append(row["latency_ms"])
+        for feature in MODEL_SPECS[name]["feature_names"]:
+            cols[feature].append(_as_float(inputs.get(feature)))
+    return columns, skipped
+
+
+def _to_table(name, cols):
+    schema = model_schema(name)
+    # Timestamps are stored as SQLite CURRENT_TIMESTAMP text; parse them in one vectorized call
+    timestamps = pc.strptime(pa.array(cols.pop("timestamp"), pa.string()), format="%Y-%m-%d %H:%M:%S", unit="ms",
+                             error_is_null=True)
+    arrays = [timestamps if field.name == "timestamp" else pa.array(cols[field.name], field.type)
+              for field in schema]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+# ─────────────── Export ─────────────── #
+def export_predictions(export_dir=EXPORT_DIR, chunk_rows=EXPORT_CHUNK_ROWS, full=False):
+    """
+    Append predictions logged since the last run to the per-model Parquet datasets.
+
+    Args:
+        export_dir: Root directory of the datasets and the checkpoint
+        chunk_rows: Rows read, decoded and written per chunk
+        full: Discard existing exports and the checkpoint and start over
+
+    Returns:
+        Dict with the id range covered and rows exported per model and skipped
+    """
+    if full:
+        for name in MODEL_SPECS:
+            shutil.rmtree(os.path.join(export_dir, name), ignore_errors=True)
+        if os.path.exists(os.path.join(export_dir, CHECKPOINT_NAME)):
+            os.remove(os.path.join(export_dir, CHECKPOINT_NAME))
+    os.makedirs(export_dir, exist_ok=True)
+    checkpoint = read_checkpoint(export_dir)
+    start_id = checkpoint["last_id"]
+    _remove_uncommitted(export_dir, start_id)
+    summary = {"from_id": start_id, "to_id": start_id, "rows": {name: 0 for name in MODEL_SPECS}, "skipped": 0}
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        # Rows logged while the export runs are left for the next run
+        cursor.execute("SELECT IFNULL(MAX(id), 0) AS max_id FROM predictions")
+        end_id = cursor.fetchone()["max_id"]
+        last_id = start_id
+        while last_id < end_id:
+            # Keyset on the rowid: each chunk is a primary-key range scan
+            cursor.execute("""
+                SELECT id, user_id, type, inputs, outcome, timestamp, risk_pct, model_version, latency_ms
+                FROM predictions
+                WHERE id > ? AND id <= ?
+                ORDER BY id
+                LIMIT ?
+            """, (last_id, end_id, chunk_rows))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            columns, skipped = _decode_chunk(rows)
+            for name, cols in columns.items():
+                ds.write_dataset(
+                    _to_table(name, cols),
+                    os.path.join(export_dir, name),
+                    format="parquet",
+                    partitioning=_PARTITIONING,
+                    basename_template=f"chunk-{rows[0]['id']:012d}-{{i}}.parquet",
+                    existing_data_behavior="overwrite_or_ignore",
+                )
+                summary["rows"][name] += len(cols["id"])
+                checkpoint["rows"][name] = checkpoint["rows"].get(name, 0) + len(cols["id"])
+            last_id = rows[-1]["id"]
+            summary["skipped"] += skipped
+            checkpoint["skipped"] = checkpoint.get("skipped", 0) + skipped
+            checkpoint["last_id"] = last_id
+            checkpoint["updated_at"] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+            _write_checkpoint(export_dir, checkpoint)
+    finally:
+        conn.close()
+
+    summary["to_id"] = checkpoint["last_id"]
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export logged predictions to partitioned Parquet datasets")
+    parser.add_argument("--out", default=EXPORT_DIR, help="Export directory")
+    parser.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS, help="Rows per read/write chunk")
+    parser.add_argument("--full", action="store_true", help="Re-export everything from the first row")
+    args = parser.parse_args(argv)
+
+    summary = export_predictions(args.out, args.chunk_rows, args.full)
+    exported = ", ".join(f"{name}: {count}" for name, count in summary["rows"].items())
+    print(f"Exported ids {summary['from_id'] + 1}-{summary['to_id']} to {args.out} "
+          f"({exported}; {summary['skipped']} rows without JSON features skipped)"
+          if summary["to_id"] > summary["from_id"] else f"Nothing new to export (checkpoint at id {summary['to_id']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+Headless model inference shared by the FastAPI prediction endpoints and the
+Streamlit apps. Per-process caching and version selection live in
+backend/registry.py.
+
+When an up-to-date export exists in backend/compiled/ (see backend/compiled.py)
+it is memory-mapped read-only instead of unpickling the sklearn objects, so all
+Streamlit and API processes on a host share a single copy of the model arrays.
+"""
+import logging
+import os
+import warnings
+
+import numpy as np
+
+from backend.compiled import CompiledModel, compiled_path, file_sha256
+from backend.metrics import INFERENCE_SECONDS
+
+# Scalers were fitted on DataFrames; we feed them plain arrays in the feature order below
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+warnings.filterwarnings("ignore", message=".*unpickle estimator.*")
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Set USE_COMPILED_MODELS=0 to force the sklearn path
+USE_COMPILED_MODELS = os.getenv("USE_COMPILED_MODELS", "1") != "0"
+
+# ─────────────── Model Specifications ─────────────── #
+# feature_names mirror the lists built in backend/routes/<name>.py
+MODEL_SPECS = {
+    "heart": {
+        "label": "Heart Disease",
+        "model_path": os.path.join(BACKEND_DIR, "heart_disease_model.sav"),
+        "scaler_path": os.path.join(BACKEND_DIR, "heart_scaler.sav"),
+        "feature_names": ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach',
+                          'exang', 'oldpeak', 'slope', 'ca', 'thal'],
+    },
+    "diabetes": {
+        "label": "Diabetes",
+        "model_path": os.path.join(BACKEND_DIR, "diabetes_model.sav"),
+        "scaler_path": os.path.join(BACKEND_DIR, "diabetes_scaler.sav"),
+        "feature_names": ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 'Insulin',
+                          'BMI', 'DiabetesPedigreeFunction', 'Age'],
+    },
+    "parkinsons": {
+        "label": "Parkinson's",
+        "model_path": os.path.join(BACKEND_DIR, "parkinsons_model.sav"),
+        "scaler_path": os.path.join(BACKEND_DIR, "parkinsons_scaler.sav"),
+        "feature_names": ['MDVP:Fo(Hz)', 'MDVP:Fhi(Hz)', 'MDVP:Flo(Hz)', 'MDVP:Jitter(%)', 'MDVP:Jitter(Abs)',
+                          'MDVP:RAP', 'MDVP:PPQ', 'Jitter:DDP', 'MDVP:Shimmer', 'MDVP:Shimmer(dB)',
+                          'Shimmer:APQ3', 'Shimmer:APQ5', 'MDVP:APQ', 'Shimmer:DDA', 'NHR', 'HNR',
+                          'RPDE', 'DFA', 'spread1', 'spread2', 'D2', 'PPE'],
+    },
+}
+
+
+def risk_band(risk_percentage):
+    """Map a risk percentage to the band used by the Streamlit apps."""
+    if risk_percentage > 70:
+        return "high"
+    if risk_percentage > 40:
+        return "moderate"
+    return "low"
+
+
+class Predictor:
+    """A fitted scaler/model pair with a fixed feature order."""
+
+    def __init__(self, name, model, scaler, feature_names, version="builtin"):
+        self.name = name
+        self.model = model
+        self.scaler = scaler
+        self.feature_names = list(feature_names)
+        self.version = version
+
+    def vectorize(self, features):
+        """
+        Convert a feature dict into a single model input row.
+
+        Raises:
+            ValueError: If any expected feature is missing.
+        """
+        missing = [f for f in self.feature_names if f not in features]
+        if missing:
+            raise ValueError(f"Missing features: {', '.join(missing)}")
+        return np.array([float(features[f]) for f in self.feature_names], dtype=np.float64)
+
+    def vectorize_many(self, rows):
+        """
+        Stack many feature dicts into one (n_rows, n_features) matrix.
+
+        Raises:
+            ValueError: If any row is missing an expected feature.
+        """
+        X = np.empty((len(rows), len(self.feature_names)), dtype=np.float64)
+        for i, features in enumerate(rows):
+            try:
+                X[i] = [float(features[f]) for f in self.feature_names]
+            except KeyError:
+                missing = [f for f in self.feature_names if f not in features]
+                raise ValueError(f"Row {i}: missing features: {', '.join(missing)}")
+            except (TypeError, ValueError):
+                raise ValueError(f"Row {i}: all features must be numeric")
+        return X
+
+    def _positive_proba(self, X):
+        if self.scaler is not None:
+            X = self.scaler.transform(X)
+        proba = self.model.predict_proba(X)
+        if proba.shape[1] < 2:
+            return np.zeros(X.shape[0])
+        return proba[:, 1]
+
+    def predict_proba(self, X):
+        """Return the positive-class probability for each row of X."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        with INFERENCE_SECONDS.time(model=self.name, batch=str(X.shape[0] > 1).lower()):
+            return self._positive_proba(X)
+
+    def predict(self, features):
+        """Score a single patient and return probability plus risk band."""
+        probability = float(self.predict_proba(self.vectorize(features))[0])
+        risk_percentage = probability * 100
+        return {
+            "model": self.name,
+            "version": self.version,
+            "probability": probability,
+            "risk_percentage": round(risk_percentage, 1),
+            "risk_band": risk_band(risk_percentage),
+        }
+
+    def warm(self):
+        """Run one throwaway prediction so lazy pages and code paths are hot."""
+        # Not recorded: warm-up latency is not what users see
+        self._positive_proba(np.zeros((1, len(self.feature_names))))
+
+    def predict_batch(self, rows):
+        """
+        Score many patients with a single scaler and predict_proba call.
+
+        Returns:
+            List of result dicts in the same order as rows
+        """
+        if not rows:
+            return []
+        probabilities = self.predict_proba(self.vectorize_many(rows))
+        results = []
+        for i, probability in enumerate(probabilities.tolist()):
+            risk_percentage = probability * 100
+            results.append({
+                "index": i,
+                "probability": probability,
+                "risk_percentage": round(risk_percentage, 1),
+                "risk_band": risk_band(risk_percentage),
+            })
+        return results
+
+
+# ─────────────── Loading ─────────────── #
+def _load_compiled(name, compiled_dir, model_path, scaler_path):
+    """Return the compiled model if it was exported from the given .sav files."""
+    if not os.path.exists(os.path.join(compiled_dir, "meta.json")):
+        return None
+    try:
+        compiled = CompiledModel.load(compiled_dir, mmap_mode="r")
+    except ValueError:
+        logger.warning(f"Compiled artifact for {name} has an old format; falling back to sklearn")
+        return None
+    source = compiled.meta.get("source", {})
+    scaler_sha = file_sha256(scaler_path) if scaler_path and os.path.exists(scaler_path) else None
+    if source.get("model_sha256") != file_sha256(model_path) or source.get("scaler_sha256") != scaler_sha:
+        logger.warning(f"Compiled artifact for {name} is stale; falling back to sklearn")
+        return None
+    return compiled
+
+
+def _load_sklearn(model_path, scaler_path):
+    import joblib
+    model = joblib.load(model_path)
+    scaler = joblib.load(scaler_path) if scaler_path and os.path.exists(scaler_path) else None
+    return model, scaler
+
+
+def load_predictor(name, model_path=None, scaler_path=None, compiled_dir=None, version="builtin"):
+    """
+    Load a predictor from disk (no caching).
+
+    Paths default to the artifacts shipped in backend/; the model registry
+    passes explicit paths for registered versions.
+    """
+    spec = MODEL_SPECS[name]
+    model_path = model_path or spec["model_path"]
+    scaler_path = scaler_path if scaler_path is not None else spec["scaler_path"]
+    compiled_dir = compiled_dir or compiled_path(name)
+
+    if USE_COMPILED_MODELS:
+        compiled = _load_compiled(name, compiled_dir, model_path, scaler_path)
+        if compiled is not None:
+            # The compiled model applies its own scaling
+            return Predictor(name, compiled, None, spec["feature_names"], version)
+
+    model, scaler = _load_sklearn(model_path, scaler_path)
+    return Predictor(name, model, scaler, spec["feature_names"], version)
@@ -0,0 +1,207 @@
+"""
+Persistent cache of LLM responses.
+
+Responses are stored in a SQLite file next to users.db and keyed on
+(model, language, system prompt, normalized messages), so identical
+assessment prompts and repeated chatbot questions are answered instantly
+and without an OpenRouter call, across restarts and across the Streamlit
+processes.
+
+Callers may also opt into a near-duplicate lookup: among entries that share
+the same model, language, system prompt and earlier conversation, the last
+user message is compared by character n-gram (Jaccard) similarity. Messages
+whose numbers differ never match, since "is 140 mg/dL high?" and "is 240
+mg/dL high?" are close in text but not in meaning.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), "data", "llm_cache.db"))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+# Minimum n-gram Jaccard similarity for a near-duplicate hit
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0.9"))
+# Most recent entries of a scope scanned for near duplicates
+LLM_CACHE_SCAN_LIMIT = int(os.getenv("LLM_CACHE_SCAN_LIMIT", "500"))
+
+NGRAM_SIZE = 3
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+# ─────────────── Keys and Signatures ─────────────── #
+def normalize_text(text):
+    """Collapse whitespace and case so trivially different prompts share a key."""
+    return _WHITESPACE.sub(" ", text or "").strip().casefold()
+
+
+def _normalize_messages(messages):
+    return [[m.get("role", ""), normalize_text(m.get("content", ""))] for m in messages]
+
+
+def _digest(*parts):
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def cache_key(model, lang, system_prompt, messages):
+    """Exact-match key over the model, language, system prompt and normalized messages."""
+    return _digest(model, lang, normalize_text(system_prompt), _normalize_messages(messages))
+
+
+def _scope_key(model, lang, system_prompt, messages):
+    """Everything but the final message: near duplicates are only searched within a scope."""
+    return _digest(model, lang, normalize_text(system_prompt), _normalize_messages(messages[:-1]))
+
+
+def ngram_signature(text):
+    """Sorted CRC32 hashes of the character n-grams of normalized text."""
+    text = normalize_text(text)
+    if len(text) < NGRAM_SIZE:
+        return [zlib.crc32(text.encode("utf-8"))]
+    return sorted({zlib.crc32(text[i:i + NGRAM_SIZE].encode("utf-8")) for i in range(len(text) - NGRAM_SIZE + 1)})
+
+
+def similarity(signature_a, signature_b):
+    """Jaccard similarity of two n-gram signatures."""
+    a, b = set(signature_a), set(signature_b)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _numbers(text):
+    return _NUMBER.findall(text or "")
+
+
+# ─────────────── Store ─────────────── #
+class LLMResponseCache:
+    """SQLite-backed response cache with TTL and least-recently-used eviction."""
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # One connection per process, shared by Streamlit's script threads under the lock
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    scope TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    signature TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_scope_used ON responses(scope, last_used DESC)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_used ON responses(last_used)")
+            conn.commit()
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _touch(self, conn, key):
+        conn.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+        conn.commit()
+
+    def get(self, model, lang, system_prompt, messages, near_duplicate=False):
+        """
+        Look up a cached response.
+
+        Args:
+            model: Model name the response was generated with
+            lang: UI language
+            system_prompt: System instructions sent with the messages
+            messages: Conversation, ending with the message being answered
+            near_duplicate: Also accept a similar (not identical) final message
+
+        Returns:
+            The cached response text, or None
+        """
+        min_created = time.time() - self.ttl
+        key = cache_key(model, lang, system_prompt, messages)
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created >= ?", (key, min_created)
+            ).fetchone()
+            if row is not None:
+                self._touch(conn, key)
+                return row[0]
+            if not near_duplicate or not messages:
+                return None
+
+            query = messages[-1].get("content", "")
+            signature = ngram_signature(query)
+            numbers = _numbers(query)
+            best_key, best_response, best_score = None, None, LLM_CACHE_SIMILARITY
+            rows = conn.execute('''
+                SELECT key, query, signature, response FROM responses
+                WHERE scope = ? AND created >= ?
+                ORDER BY last_used DESC LIMIT ?
+            ''', (_scope_key(model, lang, system_prompt, messages), min_created, LLM_CACHE_SCAN_LIMIT))
+            for candidate_key, candidate_query, candidate_signature, response in rows:
+                if _numbers(candidate_query) != numbers:
+                    continue
+                score = similarity(signature, json.loads(candidate_signature))
+                if score >= best_score:
+                    best_key, best_response, best_score = candidate_key, response, score
+            if best_key is not None:
+                self._touch(conn, best_key)
+            return best_response
+
+    def set(self, model, lang, system_prompt, messages, response):
+        """Store a response and evict expired or least recently used entries."""
+        if not response or not messages:
+            return
+        now = time.time()
+        query = messages[-1].get("content", "")
+        with self._lock:
+            conn = self._connection()
+            conn.execute('''
+                INSERT OR REPLACE INTO responses (key, scope, query, signature, response, created, last_used, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+            ''', (
+                cache_key(model, lang, system_prompt, messages),
+                _scope_key(model, lang, system_prompt, messages),
+                normalize_text(query),
+                json.dumps(ngram_signature(query)),
+                response,
+                now,
+                now,
+            ))
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute('''
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY last_used ASC LIMIT ?
+                    )
+                ''', (excess,))
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+
+llm_cache = LLMResponseCache()
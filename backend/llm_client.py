@@ -0,0 +1,340 @@
+"""
+Process-wide LLM client for OpenRouter.
+
+One AsyncOpenAI client per process runs on a background event loop and
+reuses its HTTP connections across every Streamlit session. Calls are capped
+by a concurrency semaphore, retried with jittered exponential backoff on 429,
+5xx and connection errors, and short-circuited by a breaker while the
+upstream is failing, so a degraded OpenRouter costs sessions milliseconds
+instead of piling up threads blocked for the full timeout.
+
+Streamlit script threads use the blocking `LLMClient` facade returned by
+`get_llm_client()`. Point OPENROUTER_BASE_URL at a local mock server to run
+without the real API.
+"""
+import asyncio
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+import httpx
+from openai import APIConnectionError, APIError, APIStatusError, AsyncOpenAI
+
+from backend.metrics import LLM_FIRST_TOKEN_SECONDS, LLM_REQUEST_SECONDS, LLM_REQUESTS, LLM_RETRIES, LLM_TOKENS
+from backend.token_budget import estimate_tokens, message_tokens
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+# Longest a call waits for a concurrency slot before failing fast
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+# Consecutive upstream failures that open the breaker, and how long it stays open
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+
+class LLMError(Exception):
+    """An LLM call failed."""
+
+
+class LLMUnavailableError(LLMError):
+    """The call was rejected without reaching the upstream (breaker open or no free slot)."""
+
+
+def _retryable(status_code):
+    return status_code == 429 or status_code >= 500
+
+
+def _retry_after(response):
+    """Seconds requested by a Retry-After header, if any."""
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+# ─────────────── Instrumentation ─────────────── #
+@contextmanager
+def _observed(mode):
+    """Record latency and outcome of one logical call (all retries included)."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except LLMUnavailableError:
+        outcome = "unavailable"
+        raise
+    except (GeneratorExit, asyncio.CancelledError):
+        # The consumer went away mid-stream (e.g. a Streamlit rerun)
+        outcome = "cancelled"
+        raise
+    finally:
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, mode=mode, outcome=outcome)
+        LLM_REQUESTS.inc(outcome=outcome)
+
+
+def _record_tokens(usage, messages, text):
+    """Count tokens from the reported usage, estimating when the upstream sent none."""
+    if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens or 0
+    else:
+        prompt_tokens = sum(message_tokens(m) for m in messages)
+        completion_tokens = estimate_tokens(text)
+    LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, kind="completion")
+
+
+# ─────────────── Circuit Breaker ─────────────── #
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures. Once `cooldown` seconds have
+    passed a single probe call is let through; its outcome closes or re-opens
+    the breaker. Only used from the client's event loop thread.
+    """
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, cooldown=LLM_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self._opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        """Admit or reject a call; returns True if the call is the half-open probe."""
+        if self._opened_at is None:
+            return False
+        if self._probing or time.monotonic() - self._opened_at < self.cooldown:
+            raise LLMUnavailableError("LLM circuit breaker is open")
+        self._probing = True
+        return True
+
+    def release_probe(self):
+        """End a probe that neither succeeded nor failed (e.g. cancelled); the next call probes again."""
+        self._probing = False
+
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self._probing or self._failures >= self.threshold:
+            if self._opened_at is None or self._probing:
+                logger.warning(f"LLM circuit breaker opened after {self._failures} consecutive failures")
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+
+# ─────────────── Async Client ─────────────── #
+class AsyncLLMClient:
+    """Pooled AsyncOpenAI client with a concurrency cap, retries and a circuit breaker."""
+
+    def __init__(self, api_key, base_url=OPENROUTER_BASE_URL, max_concurrency=LLM_MAX_CONCURRENCY,
+                 max_retries=LLM_MAX_RETRIES, breaker=None):
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Retries are handled here so they interact correctly with the breaker
+        self._client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+            ),
+        )
+
+    @asynccontextmanager
+    async def _slot(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), LLM_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise LLMUnavailableError("Too many concurrent LLM requests")
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    def _backoff(self, attempt, retry_after=None):
+        # Full jitter keeps retrying sessions from synchronizing
+        delay = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, LLM_RETRY_MAX_DELAY))
+        return delay
+
+    async def _create(self, **kwargs):
+        """chat.completions.create behind the breaker, retrying transient failures."""
+        error = None
+        for attempt in range(self.max_retries + 1):
+            probe = self.breaker.before_call()
+            try:
+                response = await self._client.chat.completions.create(**kwargs)
+                self.breaker.record_success()
+                return response
+            except APIConnectionError as e:
+                error, retry_after = e, None
+                self.breaker.record_failure()
+            except APIStatusError as e:
+                if not _retryable(e.status_code):
+                    # The request itself is bad; the upstream answered, so it is healthy
+                    self.breaker.record_success()
+                    raise LLMError(f"LLM request rejected ({e.status_code}): {e.message}") from e
+                error, retry_after = e, _retry_after(e.response)
+                self.breaker.record_failure()
+            except Exception as e:
+                # e.g. APIResponseValidationError: a malformed answer is not worth retrying
+                self.breaker.record_failure()
+                raise LLMError(f"LLM request failed: {e}") from e
+            finally:
+                # A cancelled probe records nothing; let the next call probe instead
+                if probe:
+                    self.breaker.release_probe()
+            if attempt < self.max_retries:
+                LLM_RETRIES.inc()
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+        raise LLMError(f"LLM request failed after {self.max_retries + 1} attempts: {error}") from error
+
+    async def complete(self, model, messages, timeout=30):
+        """Return the full completion text."""
+        with _observed("complete"):
+            async with self._slot():
+                response = await self._create(model=model, messages=messages, timeout=timeout)
+            try:
+                text = response.choices[0].message.content
+            except (AttributeError, IndexError, TypeError) as e:
+                raise LLMError(f"Malformed LLM response: {e}") from e
+        _record_tokens(getattr(response, "usage", None), messages, text)
+        return text
+
+    async def stream(self, model, messages, timeout=30):
+        """Yield completion text chunks as they arrive."""
+        start = time.perf_counter()
+        parts, usage = [], None
+        with _observed("stream"):
+            async with self._slot():
+                # include_usage adds a final chunk with token counts where the upstream supports it
+                response = await self._create(model=model, messages=messages, timeout=timeout, stream=True,
+                                              stream_options={"include_usage": True})
+                try:
+                    async for chunk in response:
+                        usage = getattr(chunk, "usage", None) or usage
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            if not parts:
+                                LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start)
+                            parts.append(chunk.choices[0].delta.content)
+                            yield chunk.choices[0].delta.content
+                except (APIError, httpx.HTTPError) as e:
+                    # Not retried: part of the answer has already been shown
+                    self.breaker.record_failure()
+                    raise LLMError(f"LLM stream interrupted: {e}") from e
+                finally:
+                    await response.close()
+                    _record_tokens(usage, messages, "".join(parts))
+
+    async def aclose(self):
+        await self._client.close()
+
+
+# ─────────────── Blocking Facade ─────────────── #
+class _LoopThread:
+    """An event loop running forever on a daemon thread."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="llm-client-loop", daemon=True).start()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def iterate(self, agen):
+        """Consume an async generator from a synchronous thread."""
+        items = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    items.put(item)
+            except Exception as e:
+                items.put(e)
+            finally:
+                items.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while True:
+                item = items.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Stops the upstream request if the consumer goes away (e.g. a Streamlit rerun)
+            future.cancel()
+
+
+class LLMClient:
+    """Blocking interface to the process-wide AsyncLLMClient."""
+
+    def __init__(self, api_key, base_url=OPENROUTER_BASE_URL):
+        self._runner = _LoopThread()
+
+        async def build():
+            # Created on the loop that will use it
+            return AsyncLLMClient(api_key, base_url)
+
+        self.async_client = self._runner.run(build())
+
+    @property
+    def breaker(self):
+        return self.async_client.breaker
+
+    def complete(self, model, messages, timeout=30):
+        return self._runner.run(self.async_client.complete(model, messages, timeout))
+
+    def stream(self, model, messages, timeout=30):
+        return self._runner.iterate(self.async_client.stream(model, messages, timeout))
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """
+    Return this process's shared LLM client, creating it on first use.
+
+    Raises:
+        ValueError: If OPENROUTER_API_KEY is not set.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                api_key = os.getenv("OPENROUTER_API_KEY")
+                if not api_key:
+                    raise ValueError("OPENROUTER_API_KEY not set in environment variables")
+                _client = LLMClient(api_key, OPENROUTER_BASE_URL)
+                _client_pid = os.getpid()
+    return _client
@@ -2,16 +2,35 @@ import subprocess
 import sys
 import logging
 import os
-from fastapi import FastAPI, HTTPException, Body, Header, Depends
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, Body, Header, Depends, UploadFile, File, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr
-from backend.database import get_db_connection, init_db
+from backend.database import get_db_connection, init_db, canonical_email, flush_prediction_log
+from backend.inference import MODEL_SPECS
+from backend.registry import get_predictor, warm_predictors, list_versions, promote
+from backend.cache import TTLCache
+from backend.supervisor import api_owner_pid, get_status as get_supervisor_status, spawn_if_absent as spawn_supervisor_if_absent
 import sqlite3
 from fastapi.staticfiles import StaticFiles
+from backend.static_assets import PrecompressedStaticFiles, has_build as has_static_build
+from backend.metrics import (
+    AUTH_SECONDS, AUTH_TOKEN_CACHE, DB_QUERY_SECONDS, HTTP_REQUEST_SECONDS,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, render_prometheus,
+)
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from passlib.context import CryptContext
 import jwt
 from datetime import datetime, timedelta
+from typing import Dict, List
+import base64
+import time
+import csv
+import io
+import itertools
+import json
 
 # Lazy load routes to avoid loading incompatible models at startup
 # from backend.routes import heart 
@@ -39,6 +58,38 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# bcrypt burns ~100-300ms of CPU per call, so it runs in a bounded thread pool
+# (bcrypt releases the GIL) instead of on the event loop. Requests beyond
+# PASSWORD_HASH_MAX_PENDING in flight are rejected with 503 rather than queued.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_password_pending = 0
+
+async def _run_password_task(func, *args):
+    global _password_pending
+    if _password_pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+    # Only touched from the event loop thread, so no lock is needed
+    _password_pending += 1
+    try:
+        # Timed from submission so pool queueing shows up in the histogram
+        with AUTH_SECONDS.time(operation=func.__name__):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_password_executor, func, *args)
+    finally:
+        _password_pending -= 1
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await _run_password_task(get_password_hash, password)
+
 # JWT constants
 SECRET_KEY = os.getenv("JWT_SECRET", "supersecretkey123")
 ALGORITHM = "HS256"
@@ -51,22 +102,64 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Verified tokens map to their claims until the token's own exp, so repeat
+# requests (dashboard polling) skip the HMAC check. Only valid tokens are cached.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+_token_cache = TTLCache(TOKEN_CACHE_SIZE, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
 def get_current_user(authorization: str = Header(None)):
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Missing or invalid token")
     
     token = authorization.split(" ")[1]
+    cached = _token_cache.get(token)
+    if cached is not None:
+        AUTH_TOKEN_CACHE.inc(result="hit")
+        expires_at, user = cached
+        if time.time() < expires_at:
+            return dict(user)
+        raise HTTPException(status_code=401, detail="Token expired")
+    AUTH_TOKEN_CACHE.inc(result="miss")
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with AUTH_SECONDS.time(operation="jwt_decode"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             raise HTTPException(status_code=401, detail="Invalid token payload")
-        return {"email": email, "is_admin": payload.get("is_admin", False)}
+        user = {"email": email, "is_admin": payload.get("is_admin", False)}
+        if "exp" in payload:
+            _token_cache.set(token, (payload["exp"], user))
+        return dict(user)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+def get_current_user_row(request: Request, current_user: dict = Depends(get_current_user)):
+    """
+    The authenticated user's row, loaded at most once per request and kept on
+    request.state so handlers and helpers can share it without another query.
+    """
+    row = getattr(request.state, "user_row", None)
+    if row is None:
+        with DB_QUERY_SECONDS.time(operation="user_row"):
+            conn = get_db_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT id, email, fullname, is_admin FROM users WHERE email_canonical = ?",
+                    (canonical_email(current_user["email"]),)
+                )
+                found = cursor.fetchone()
+            finally:
+                conn.close()
+        if found is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        row = dict(found)
+        request.state.user_row = row
+    return row
+
 app = FastAPI()
 
 # CORS
@@ -78,29 +171,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Per-route latency histogram; static files and /metrics itself are not recorded."""
+    start = time.perf_counter()
+    # An exception escaping the app becomes a 500 for the client, so record it as one
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", None)
+        if path and path.startswith("/api/"):
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=request.method, route=path, status=status
+            )
+
 
 class UserRegister(BaseModel):
     email: EmailStr
     password: str
     fullname: str
 
+class PromoteRequest(BaseModel):
+    version: str
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+class PredictionRequest(BaseModel):
+    features: Dict[str, float]
+
+class PredictionResponse(BaseModel):
+    model: str
+    version: str
+    probability: float
+    risk_percentage: float
+    risk_band: str
+
 @app.post("/api/register")
 async def register(user: UserRegister):
+    # Hash before taking a connection so the pool is not held during bcrypt
+    hashed_password = await get_password_hash_async(user.password)
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
         # Normalize email to lowercase
-        email_normalized = user.email.strip().lower()
+        email_normalized = canonical_email(user.email)
         
-        cursor.execute(
-            "INSERT INTO users (email, password, fullname) VALUES (?, ?, ?)",
-            (email_normalized, get_password_hash(user.password), user.fullname)
-        )
-        conn.commit()
+        with DB_QUERY_SECONDS.time(operation="register_insert"):
+            cursor.execute(
+                "INSERT INTO users (email, email_canonical, password, fullname) VALUES (?, ?, ?, ?)",
+                (email_normalized, email_normalized, hashed_password, user.fullname)
+            )
+            conn.commit()
         return {"message": "User registered successfully"}
     except sqlite3.IntegrityError:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -109,20 +237,23 @@ async def register(user: UserRegister):
 
 @app.post("/api/login")
 async def login(user: UserLogin):
-    conn = get_db_connection()
-    cursor = conn.cursor()
     # Parameterized query to prevent SQL injection
     # Normalize email
-    email_normalized = user.email.strip().lower()
+    email_normalized = canonical_email(user.email)
     
-    cursor.execute(
-        "SELECT * FROM users WHERE LOWER(email) = ?",
-        (email_normalized,)
-    )
-    db_user = cursor.fetchone()
-    conn.close()
+    with DB_QUERY_SECONDS.time(operation="login_lookup"):
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT * FROM users WHERE email_canonical = ?",
+                (email_normalized,)
+            )
+            db_user = cursor.fetchone()
+        finally:
+            conn.close()
     
-    if db_user and verify_password(user.password, db_user["password"]):
+    if db_user and await verify_password_async(user.password, db_user["password"]):
         token = create_access_token({
             "sub": db_user["email"],
             "is_admin": bool(db_user["is_admin"])
@@ -140,118 +271,242 @@ async def login(user: UserLogin):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
 @app.get("/api/admin/stats")
-async def get_admin_stats(current_user: dict = Depends(get_current_user)):
-    if not current_user["is_admin"]:
+async def get_admin_stats(user_row: dict = Depends(get_current_user_row)):
+    if not user_row["is_admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    email = current_user["email"]
+    query_start = time.perf_counter()
     conn = get_db_connection()
-    cursor = conn.cursor()
+    try:
+        cursor = conn.cursor()
     
-    # Get total user count
-    cursor.execute("SELECT COUNT(*) as count FROM users")
-    user_count = cursor.fetchone()["count"]
+        # Every read below hits trigger-maintained rollups (see database._migration_stats_rollups),
+        # so the cost does not grow with the size of the predictions table.
+        cursor.execute("SELECT value FROM stats_counters WHERE name = 'users'")
+        row = cursor.fetchone()
+        user_count = row["value"] if row else 0
     
-    # Get recent predictions
-    cursor.execute("""
-        SELECT p.*, IFNULL(u.fullname, 'Guest User') as fullname 
-        FROM predictions p 
-        LEFT JOIN users u ON p.user_id = u.id 
-        ORDER BY timestamp DESC LIMIT 10
-    """)
-    recent_predictions = [dict(row) for row in cursor.fetchall()]
+        # Get recent predictions from the ring of latest ids
+        cursor.execute("""
+            SELECT p.*, IFNULL(u.fullname, 'Guest User') as fullname 
+            FROM recent_predictions r
+            JOIN predictions p ON p.id = r.prediction_id
+            LEFT JOIN users u ON p.user_id = u.id 
+            ORDER BY p.id DESC
+        """)
+        recent_predictions = [dict(row) for row in cursor.fetchall()]
     
-    # Get prediction breakdown
-    cursor.execute("SELECT type, COUNT(*) as count FROM predictions GROUP BY type")
-    breakdown = {row["type"]: row["count"] for row in cursor.fetchall()}
+        # Get prediction breakdown
+        cursor.execute("SELECT type, count FROM prediction_type_counts WHERE count > 0")
+        breakdown = {row["type"]: row["count"] for row in cursor.fetchall()}
     
-    conn.close()
+        # Per-day counts for the last 30 days
+        cursor.execute("""
+            SELECT day, type, count FROM prediction_daily_counts
+            WHERE day >= DATE('now', '-29 days') AND count > 0
+            ORDER BY day
+        """)
+        daily_breakdown = [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+    DB_QUERY_SECONDS.observe(time.perf_counter() - query_start, operation="admin_stats")
     
     return {
         "total_users": user_count,
         "recent_predictions": recent_predictions,
-        "prediction_breakdown": breakdown
+        "prediction_breakdown": breakdown,
+        "daily_breakdown": daily_breakdown
     }
 
-@app.get("/api/user/stats")
-async def get_user_stats(current_user: dict = Depends(get_current_user)):
+# History page sizes; /api/user/stats only carries the first page
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", "100"))
+
+def _encode_cursor(prediction):
+    """Opaque cursor for the (timestamp, id) keyset of a history row."""
+    raw = json.dumps([prediction["timestamp"], prediction["id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor):
+    try:
+        timestamp, prediction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(timestamp), int(prediction_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _history_page(user_id, cursor=None, limit=HISTORY_PAGE_SIZE):
     from backend.database import get_user_predictions
-    import re
     
-    email = current_user["email"]
-    predictions = get_user_predictions(email)
+    before = _decode_cursor(cursor) if cursor else None
+    # Fetch one extra row to learn whether another page exists
+    rows = get_user_predictions(user_id, limit=limit + 1, before=before)
+    predictions = rows[:limit]
+    next_cursor = _encode_cursor(predictions[-1]) if len(rows) > limit else None
+    return predictions, next_cursor
+
+@app.get("/api/user/stats")
+async def get_user_stats(user_row: dict = Depends(get_current_user_row)):
+    from backend.database import get_wellness_score
     
-    # Calculate Wellness Score
-    latest_by_type = {}
-    for p in predictions:
-        if p["type"] not in latest_by_type:
-            latest_by_type[p["type"]] = p
-            
-    scores = []
-    assessment_types = ["Heart Disease", "Diabetes", "Parkinson's"]
+    user_id = user_row["id"]
+    # Bounded to the first history page; older rows come from /api/user/predictions
+    predictions, next_cursor = _history_page(user_id)
     
-    for t in assessment_types:
-        if t in latest_by_type:
-            outcome = latest_by_type[t]["outcome"]
-            # Extract number from "75.0% Risk"
-            match = re.search(r"(\d+\.?\d*)%", outcome)
-            if match:
-                risk_pct = float(match.group(1))
-                scores.append(100 - risk_pct)
-            else:
-                scores.append(100)
-        else:
-            scores.append(100)
-            
-    wellness_score = sum(scores) / len(assessment_types)
+    # Latest risk per assessment type, averaged in SQL from the risk_pct column
+    wellness_score = get_wellness_score(user_id)
     
     return {
         "predictions": predictions,
-        "wellness_score": round(wellness_score, 1)
+        "next_cursor": next_cursor,
+        "wellness_score": wellness_score
+    }
+
+@app.get("/api/user/predictions")
+async def get_user_prediction_history(
+    cursor: str = Query(None),
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_PAGE_MAX),
+    user_row: dict = Depends(get_current_user_row)
+):
+    predictions, next_cursor = _history_page(user_row["id"], cursor, limit)
+    return {"predictions": predictions, "next_cursor": next_cursor}
+
+@app.get("/api/user/summary")
+async def get_user_summary(user_row: dict = Depends(get_current_user_row)):
+    from backend.database import get_wellness_score, get_latest_predictions
+    
+    user_id = user_row["id"]
+    return {
+        "wellness_score": get_wellness_score(user_id),
+        "latest": get_latest_predictions(user_id)
     }
 
-app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
+# Upper bound on rows per batch request to keep memory per request bounded
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "10000"))
+
+def _get_predictor_or_404(model_name):
+    try:
+        return get_predictor(model_name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {model_name}")
+
+@app.post("/api/predict/{model_name}", response_model=PredictionResponse)
+def predict(model_name: str, request: PredictionRequest):
+    """Score a single patient without going through the Streamlit apps."""
+    predictor = _get_predictor_or_404(model_name)
+    try:
+        return predictor.predict(request.features)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def _stream_batch(predictor, rows):
+    """Score all rows in one vectorized call and stream results as NDJSON."""
+    if len(rows) > MAX_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_ROWS} rows")
+    try:
+        results = predictor.predict_batch(rows)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    def generate():
+        for result in results:
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
-# Store process handles for cleanup
-_streamlit_processes = []
+@app.post("/api/predict/{model_name}/batch")
+def predict_batch(model_name: str, rows: List[Dict[str, float]] = Body(...)):
+    """Score a JSON array of patients, one result per line."""
+    predictor = _get_predictor_or_404(model_name)
+    return _stream_batch(predictor, rows)
+
+@app.post("/api/predict/{model_name}/batch/csv")
+def predict_batch_csv(model_name: str, file: UploadFile = File(...)):
+    """Score a CSV screening list whose header contains the model's feature names."""
+    predictor = _get_predictor_or_404(model_name)
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig")
+    try:
+        # Read one row past the limit so an oversized upload is rejected without loading it all
+        rows = list(itertools.islice(csv.DictReader(text), MAX_BATCH_ROWS + 1))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV file must be UTF-8 encoded")
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"Malformed CSV: {e}")
+    return _stream_batch(predictor, rows)
+
+@app.get("/api/admin/models")
+async def list_models(user_row: dict = Depends(get_current_user_row)):
+    if not user_row["is_admin"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return {name: list_versions(name) for name in MODEL_SPECS}
+
+@app.post("/api/admin/models/{model_name}/promote")
+def promote_model(model_name: str, request: PromoteRequest, user_row: dict = Depends(get_current_user_row)):
+    """Activate a registered model version; all workers hot-swap to it."""
+    if not user_row["is_admin"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    if model_name not in MODEL_SPECS:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {model_name}")
+    try:
+        promote(model_name, request.version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"message": f"{model_name} promoted to {request.version}"}
+
+@app.get("/api/admin/apps")
+def get_app_status(user_row: dict = Depends(get_current_user_row)):
+    """Health and restart status of the supervised Streamlit apps."""
+    if not user_row["is_admin"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    status = get_supervisor_status()
+    if status is None:
+        return {"supervisor": "unreachable", "apps": []}
+    return {"supervisor": "running", **status}
+
+@app.get("/metrics")
+def get_metrics():
+    """Latency histograms and counters of the API and Streamlit processes, in Prometheus text format."""
+    return PlainTextResponse(render_prometheus(), media_type=METRICS_CONTENT_TYPE)
+
+# Set SERVE_STATIC_BUILD=1 to serve the fingerprinted, precompressed build
+# from `python -m backend.static_assets` instead of the raw frontend/ tree
+if os.getenv("SERVE_STATIC_BUILD", "0") == "1" and has_static_build():
+    app.mount("/", PrecompressedStaticFiles(), name="frontend")
+else:
+    app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
+
+STREAMLIT_AUTOSTART = os.getenv("STREAMLIT_AUTOSTART", "1") != "0"
 
 
 @app.on_event("startup")
 def startup_event():
-    """Initialize database and start Streamlit apps."""
+    """Initialize database, load models and start Streamlit apps."""
     init_db()
+    warm_predictors()
     launch_streamlit_apps()
 
 def launch_streamlit_apps():
-    """Start multiple Streamlit apps at different ports with error handling."""
-    apps_to_launch = [
-        ("backend/routes/heart.py", 8501),
-        ("backend/routes/diabetes.py", 8502),
-        ("backend/routes/parkinsons.py", 8503),
-        ("backend/routes/bot.py", 8504)
-    ]
-    for app_path, port in apps_to_launch:
-        try:
-            logger.info(f"Starting Streamlit app: {app_path} on port {port}")
-            process = subprocess.Popen([
-                sys.executable, "-m", "streamlit", "run", app_path,
-                "--server.port", str(port),
-                "--server.headless", "true"
-            ])
-            _streamlit_processes.append(process)
-        except Exception as e:
-            logger.error(f"Failed to start {app_path}: {str(e)}")
+    """
+    Make sure the host's Streamlit supervisor is running; it starts and watches the apps.
+    Workers never stop it: it follows the uvicorn manager process (see backend/supervisor.py),
+    so a recycled or reloaded worker leaves the apps of the other workers running.
+    """
+    if not STREAMLIT_AUTOSTART:
+        return
+    try:
+        supervisor_process = spawn_supervisor_if_absent(owner_pid=api_owner_pid())
+        if supervisor_process is not None:
+            logger.info(f"Started Streamlit supervisor (pid {supervisor_process.pid})")
+    except Exception as e:
+        logger.error(f"Failed to start Streamlit supervisor: {str(e)}")
 
 @app.on_event("shutdown")
-def shutdown_streamlit_apps():
-    """Clean up Streamlit processes on shutdown."""
-    for process in _streamlit_processes:
-        try:
-            process.terminate()
-            process.wait(timeout=5)
-            logger.info("Streamlit process terminated gracefully")
-        except subprocess.TimeoutExpired:
-            process.kill()
-            logger.warning("Streamlit process killed")
-        except Exception as e:
-            logger.error(f"Error terminating process: {str(e)}")
+def flush_pending_logs():
+    """Commit prediction events still queued in the background log writer."""
+    flush_prediction_log()
+
+@app.on_event("shutdown")
+def stop_password_executor():
+    """Release the password hashing threads without waiting on hashes still running."""
+    _password_executor.shutdown(wait=False)
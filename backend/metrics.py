@@ -0,0 +1,312 @@
+"""
+Latency histograms and counters for the API and the Streamlit apps.
+
+Every process records into its own in-memory registry and a background
+thread writes it to METRICS_DIR/<pid>.json every METRICS_FLUSH_SECONDS.
+GET /metrics merges the snapshots of all processes on the host with the live
+registry of the process serving the scrape, and renders them in the
+Prometheus text exposition format, so one scrape covers every uvicorn worker
+and Streamlit replica.
+
+Snapshots of exited processes are kept, so merged counters do not go
+backwards on a restart, until they are older than METRICS_RETENTION_SECONDS.
+
+Usage:
+    with INFERENCE_SECONDS.time(model="heart"):
+        ...
+    LLM_TOKENS.inc(120, kind="completion")
+"""
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import ContextDecorator
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "metrics"))
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+METRICS_RETENTION_SECONDS = float(os.getenv("METRICS_RETENTION_SECONDS", str(24 * 3600)))
+METRICS_PREFIX = "healthpredict_"
+
+# Seconds; fine at the low end for inference/DB/cache hits, coarse up to LLM timeouts
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ─────────────── Metric Types ─────────────── #
+class _Timer(ContextDecorator):
+    """Observes elapsed wall time into a histogram; usable as `with` or decorator."""
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self._starts = threading.local()
+
+    def __enter__(self):
+        # A stack, so one decorated function may recurse or run on many threads
+        self._starts.__dict__.setdefault("stack", []).append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._starts.stack.pop()
+        self.histogram.observe(elapsed, **self.labels)
+        return False
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = METRICS_PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _reset(self):
+        with self._lock:
+            self._values = {}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        # Exposed as <name>_total, as Prometheus expects for counters
+        super().__init__(name + "_total", documentation, labelnames)
+
+    def inc(self, amount=1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        registry.touch()
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        # Per-bucket (non-cumulative) counts; the last slot is +Inf
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+        registry.touch()
+
+    def time(self, **labels):
+        """Context manager / decorator timing a block in seconds."""
+        self._key(labels)
+        return _Timer(self, labels)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), list(counts), total] for key, (counts, total) in self._values.items()]
+
+
+# ─────────────── Registry ─────────────── #
+class Registry:
+    """The process's metrics plus the thread that persists them for other processes."""
+
+    def __init__(self, directory=METRICS_DIR, flush_interval=METRICS_FLUSH_SECONDS):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._metrics = {}
+        self._dirty = False
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+
+    def touch(self):
+        self._dirty = True
+        if self._pid != os.getpid():
+            self._start_flusher()
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Forked child: the parent's samples are already in the parent's file
+                for metric in self._metrics.values():
+                    metric._reset()
+            self._pid = os.getpid()
+            threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.flush_interval)
+            if self._dirty:
+                self.flush()
+
+    def snapshot(self):
+        metrics = {}
+        for metric in self._metrics.values():
+            entry = {
+                "type": metric.kind,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "samples": metric.snapshot(),
+            }
+            if metric.kind == "histogram":
+                entry["buckets"] = list(metric.buckets)
+            metrics[metric.name] = entry
+        return {"pid": os.getpid(), "written_at": time.time(), "metrics": metrics}
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def flush(self):
+        """Write this process's snapshot atomically."""
+        if self._pid is None:
+            return
+        self._dirty = False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(os.getpid())
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, separators=(",", ":"))
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot: {e}")
+
+    def _load_others(self):
+        """Snapshots written by the other processes on this host."""
+        snapshots = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return snapshots
+        own = f"{os.getpid()}.json"
+        cutoff = time.time() - METRICS_RETENTION_SECONDS
+        for name in names:
+            if not name.endswith(".json") or name == own:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # being replaced or removed by its owner
+        return snapshots
+
+    def collect(self):
+        """Merge every process's snapshot into {name: entry} with summed samples."""
+        merged = {}
+        for snapshot in [self.snapshot()] + self._load_others():
+            for name, entry in snapshot.get("metrics", {}).items():
+                target = merged.setdefault(name, {
+                    "type": entry["type"],
+                    "help": entry["help"],
+                    "labelnames": entry["labelnames"],
+                    "buckets": entry.get("buckets"),
+                    "samples": {},
+                })
+                if target["type"] != entry["type"] or target["buckets"] != entry.get("buckets"):
+                    continue  # written by a different version of this module
+                for sample in entry["samples"]:
+                    key = tuple(sample[0])
+                    if entry["type"] == "counter":
+                        target["samples"][key] = target["samples"].get(key, 0) + sample[1]
+                    else:
+                        counts, total = target["samples"].get(key, ([0] * len(sample[1]), 0.0))
+                        target["samples"][key] = ([a + b for a, b in zip(counts, sample[1])], total + sample[2])
+        return merged
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render_prometheus(merged=None):
+    """Host-wide metrics in the Prometheus text exposition format (version 0.0.4)."""
+    merged = registry.collect() if merged is None else merged
+    lines = []
+    for name in sorted(merged):
+        entry = merged[name]
+        lines.append(f"# HELP {name} {entry['help']}")
+        lines.append(f"# TYPE {name} {entry['type']}")
+        for key in sorted(entry["samples"]):
+            value = entry["samples"][key]
+            if entry["type"] == "counter":
+                lines.append(f"{name}{_labels(entry['labelnames'], key)} {value:g}")
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(list(entry["buckets"]) + ["+Inf"], counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{bound:g}"'
+                lines.append(f"{name}_bucket{_labels(entry['labelnames'], key, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(entry['labelnames'], key)} {total:.6g}")
+            lines.append(f"{name}_count{_labels(entry['labelnames'], key)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+# ─────────────── Application Metrics ─────────────── #
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "API request latency by route template.", ("method", "route", "status"))
+INFERENCE_SECONDS = Histogram(
+    "inference_seconds", "Scaler plus model predict_proba time per call.", ("model", "batch"))
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_seconds", "LLM call latency including queueing and retries; for streams, until the last chunk.",
+    ("mode", "outcome"))
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "llm_first_token_seconds", "Time until the first streamed chunk of an LLM answer.")
+LLM_REQUESTS = Counter(
+    "llm_requests", "LLM calls by outcome (ok, error, unavailable, cancelled, cache_hit).", ("outcome",))
+LLM_RETRIES = Counter(
+    "llm_retries", "Upstream LLM attempts that were retried.")
+LLM_TOKENS = Counter(
+    "llm_tokens", "LLM tokens from the reported usage, or estimated when none is reported.", ("kind",))
+PDF_RENDER_SECONDS = Histogram(
+    "pdf_render_seconds", "PDF report generation time.", ("cache",))
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds", "Database operation time, including waiting for a pooled connection.", ("operation",))
+AUTH_SECONDS = Histogram(
+    "auth_seconds", "Authentication step time (bcrypt runs include thread-pool queueing).", ("operation",))
+AUTH_TOKEN_CACHE = Counter(
+    "auth_token_cache", "Bearer token lookups in the verified-token cache.", ("result",))
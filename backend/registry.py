@@ -0,0 +1,293 @@
+"""
+Versioned model registry with zero-downtime hot swap.
+
+Registered versions live in backend/model_registry/<name>/<version>/ together
+with their compiled export, and registry.json records each version's checksums
+and which one is active. Promoting a version rewrites registry.json atomically;
+every running process notices the change on its next lookup, loads and warms
+the new predictor in a background thread, and only then swaps it in, so no
+request waits on a cold load or is dropped.
+
+Usage:
+    python -m backend.registry register heart path/to/model.sav path/to/scaler.sav
+    python -m backend.registry promote heart v2
+    python -m backend.registry list
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+from backend.compiled import export_files, file_sha256
+from backend.inference import MODEL_SPECS, load_predictor
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_DIR = os.path.join(BACKEND_DIR, "model_registry")
+MANIFEST_PATH = os.path.join(REGISTRY_DIR, "registry.json")
+# Sidecar file locked around every read-modify-write of registry.json
+MANIFEST_LOCK_PATH = os.path.join(REGISTRY_DIR, "registry.lock")
+
+# The artifacts shipped in backend/ are always available under this version
+BUILTIN_VERSION = "builtin"
+
+# How often a process re-stats registry.json for promotions
+RELOAD_CHECK_SECONDS = float(os.getenv("MODEL_RELOAD_CHECK_SECONDS", "2"))
+
+
+# ─────────────── Manifest ─────────────── #
+def read_manifest():
+    """Return the registry manifest, or an empty one if nothing is registered."""
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"models": {}}
+
+
+@contextmanager
+def _manifest_lock():
+    """
+    Hold an exclusive lock on the registry across threads and processes.
+
+    Readers do not need it (registry.json is replaced atomically); writers
+    take it around read_manifest() ... _write_manifest() so concurrent
+    register/promote calls cannot overwrite each other's changes.
+    """
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    # Each call opens its own file, so threads of one process exclude each other too
+    with open(MANIFEST_LOCK_PATH, "a+b") as f:
+        if os.name == "nt":
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _write_manifest(manifest):
+    """Replace registry.json atomically so readers never see a partial file."""
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix="registry.", suffix=".tmp", dir=REGISTRY_DIR)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, MANIFEST_PATH)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def active_version(name, manifest=None):
+    """Return the active version for a model, defaulting to the built-in one."""
+    manifest = manifest if manifest is not None else read_manifest()
+    return manifest["models"].get(name, {}).get("active", BUILTIN_VERSION)
+
+
+def version_paths(name, version):
+    """Return (model_path, scaler_path, compiled_dir) for a version."""
+    if version == BUILTIN_VERSION:
+        spec = MODEL_SPECS[name]
+        return spec["model_path"], spec["scaler_path"], None
+    version_dir = os.path.join(REGISTRY_DIR, name, version)
+    scaler_path = os.path.join(version_dir, "scaler.sav")
+    return (
+        os.path.join(version_dir, "model.sav"),
+        scaler_path if os.path.exists(scaler_path) else "",
+        os.path.join(version_dir, "compiled"),
+    )
+
+
+def list_versions(name):
+    """Return the registered versions of a model with their metadata."""
+    manifest = read_manifest()
+    entry = manifest["models"].get(name, {})
+    versions = {BUILTIN_VERSION: {"created": None}}
+    versions.update(entry.get("versions", {}))
+    return {"active": entry.get("active", BUILTIN_VERSION), "versions": versions}
+
+
+def register(name, model_path, scaler_path=None, version=None):
+    """
+    Copy a model/scaler pair into the registry and export its compiled form.
+
+    The new version is not served until it is promoted. If anything fails
+    before the manifest is written, the version directory is removed again.
+
+    Returns:
+        The version name
+    """
+    if name not in MODEL_SPECS:
+        raise KeyError(name)
+    with _manifest_lock():
+        manifest = read_manifest()
+        entry = manifest["models"].setdefault(name, {"active": BUILTIN_VERSION, "versions": {}})
+        if version is None:
+            version = f"v{len(entry['versions']) + 1}"
+        if version == BUILTIN_VERSION or version in entry["versions"]:
+            raise ValueError(f"Version {version} already exists for {name}")
+
+        version_dir = os.path.join(REGISTRY_DIR, name, version)
+        os.makedirs(version_dir)
+        try:
+            shutil.copyfile(model_path, os.path.join(version_dir, "model.sav"))
+            if scaler_path:
+                shutil.copyfile(scaler_path, os.path.join(version_dir, "scaler.sav"))
+
+            reg_model, reg_scaler, compiled_dir = version_paths(name, version)
+            try:
+                export_files(name, reg_model, reg_scaler, compiled_dir)
+            except ValueError as e:
+                # Unsupported estimators are still servable through sklearn
+                logger.warning(f"Could not compile {name} {version}: {e}")
+
+            entry["versions"][version] = {
+                "model_sha256": file_sha256(reg_model),
+                "scaler_sha256": file_sha256(reg_scaler) if reg_scaler else None,
+                "created": datetime.utcnow().isoformat(timespec="seconds"),
+            }
+            _write_manifest(manifest)
+        except BaseException:
+            shutil.rmtree(version_dir, ignore_errors=True)
+            raise
+    return version
+
+
+def promote(name, version):
+    """
+    Make a version active for every process on the host.
+
+    The version is checksum-verified and warmed in this process before the
+    manifest changes, so a broken artifact never becomes active.
+    """
+    with _manifest_lock():
+        manifest = read_manifest()
+        entry = manifest["models"].setdefault(name, {"active": BUILTIN_VERSION, "versions": {}})
+        if version != BUILTIN_VERSION:
+            info = entry["versions"].get(version)
+            if info is None:
+                raise KeyError(f"{name} has no version {version}")
+            model_path, scaler_path, _ = version_paths(name, version)
+            if file_sha256(model_path) != info["model_sha256"] or (
+                    scaler_path and file_sha256(scaler_path) != info["scaler_sha256"]):
+                raise ValueError(f"Checksum mismatch for {name} {version}")
+
+        _load_warm(name, version)
+        entry["active"] = version
+        _write_manifest(manifest)
+    logger.info(f"Promoted {name} to {version}")
+
+
+# ─────────────── Per-Process Hot-Swappable Cache ─────────────── #
+_predictors = {}
+_swapping = set()
+_lock = threading.Lock()
+_last_check = 0.0
+_manifest_mtime = None
+
+
+def _load_warm(name, version):
+    model_path, scaler_path, compiled_dir = version_paths(name, version)
+    predictor = load_predictor(name, model_path, scaler_path, compiled_dir, version)
+    predictor.warm()
+    return predictor
+
+
+def _swap_in(name, version):
+    """Load and warm a version in the background, then replace the live predictor."""
+    try:
+        predictor = _load_warm(name, version)
+        _predictors[name] = predictor
+        logger.info(f"Hot-swapped {name} to {version}")
+    except Exception as e:
+        logger.error(f"Failed to load {name} {version}, keeping current model: {e}")
+    finally:
+        with _lock:
+            _swapping.discard(name)
+
+
+def _check_for_promotions():
+    """Start background swaps for models whose active version changed."""
+    global _last_check, _manifest_mtime
+    now = time.monotonic()
+    if now - _last_check < RELOAD_CHECK_SECONDS:
+        return
+    _last_check = now
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    if mtime == _manifest_mtime:
+        return
+    _manifest_mtime = mtime
+
+    manifest = read_manifest()
+    for name, predictor in list(_predictors.items()):
+        version = active_version(name, manifest)
+        with _lock:
+            if predictor.version == version or name in _swapping:
+                continue
+            _swapping.add(name)
+        threading.Thread(target=_swap_in, args=(name, version), daemon=True).start()
+
+
+def get_predictor(name):
+    """
+    Get the live predictor for a model, loading it on first use.
+
+    Raises:
+        KeyError: If the model name is unknown.
+    """
+    if name not in MODEL_SPECS:
+        raise KeyError(name)
+    _check_for_promotions()
+    predictor = _predictors.get(name)
+    if predictor is None:
+        with _lock:
+            predictor = _predictors.get(name)
+            if predictor is None:
+                predictor = _load_warm(name, active_version(name))
+                _predictors[name] = predictor
+    return predictor
+
+
+def warm_predictors():
+    """Load every active model up front so the first request does not pay for it."""
+    for name in MODEL_SPECS:
+        get_predictor(name)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    command, args = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ("list", [])
+    if command == "register" and len(args) in (2, 3):
+        print(register(args[0], args[1], args[2] if len(args) == 3 else None))
+    elif command == "promote" and len(args) == 2:
+        promote(args[0], args[1])
+    elif command == "list":
+        for model_name in MODEL_SPECS:
+            print(model_name, json.dumps(list_versions(model_name), indent=2))
+    else:
+        print(__doc__)
+        sys.exit(1)
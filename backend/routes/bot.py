@@ -1,5 +1,4 @@
 import streamlit as st
-import time
 import os
 import sys
 from dotenv import load_dotenv
@@ -7,6 +6,7 @@ from dotenv import load_dotenv
 # Add parent directory to path for importing utils
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils import apply_common_styling, render_navbar, get_openai_client, get_model_name, call_openai_api, get_language
+from backend.token_budget import compact_history, new_budget_state
 
 # Load environment variables
 load_dotenv()
@@ -113,6 +113,8 @@ if "messages" not in st.session_state:
     st.session_state.messages = [
         {"role": "assistant", "content": L('hello')}
     ]
+if "history_budget" not in st.session_state:
+    st.session_state.history_budget = new_budget_state()
 
 # ───── Show All Previous Messages ───── #
 for msg in st.session_state.messages:
@@ -131,18 +133,14 @@ if user_input := st.chat_input(L('placeholder')):
         full_response = ""
         with st.spinner(L('thinking')):
             system_prompt = L('system_prompt') + " If the user ask non-medical question, say it's not medical related."
+            # Send recent turns verbatim and older ones as a running summary
+            system_prompt, recent_messages = compact_history(st.session_state.messages, system_prompt, st.session_state.history_budget)
             
-            full_response = call_openai_api(client, model=openrouter_model, timeout=30, system_prompt=system_prompt, messages=st.session_state.messages)
+            # Render tokens as they arrive
+            with message_placeholder.container():
+                full_response = st.write_stream(call_openai_api(client, model=openrouter_model, timeout=30, system_prompt=system_prompt, messages=recent_messages, stream=True, near_duplicate=True))
             
-            if full_response:
-                # Simulate typing effect
-                display_text = ""
-                for word in full_response.split():
-                    display_text += word + " "
-                    time.sleep(0.03)
-                    message_placeholder.markdown(display_text + "▌")
-                message_placeholder.markdown(full_response)
-            else:
+            if not full_response:
                 error_msg = L('error')
                 message_placeholder.error(error_msg)
                 full_response = error_msg
@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 import os
 import sys
+import time
 import warnings
 from dotenv import load_dotenv
 
@@ -12,7 +13,8 @@ warnings.filterwarnings("ignore", message=".*unpickle estimator.*")
 
 # Add parent directory to path for importing utils
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import apply_common_styling, apply_button_styling, render_navbar, load_model, get_openai_client, get_model_name, call_openai_api, get_language, get_text, render_risk_meter, generate_pdf_report
+from utils import apply_common_styling, apply_button_styling, render_navbar, load_predictor, get_openai_client, get_model_name, call_openai_api, get_language, get_text, render_risk_meter, generate_pdf_report
+from backend.cache import prediction_cache, prediction_cache_key, cached_pdf
 
 # Load environment variables
 load_dotenv()
@@ -101,17 +103,8 @@ except ValueError as e:
     st.error(f"Configuration Error: {str(e)}. Please set OPENROUTER_API_KEY in environment.")
     st.stop()
 
-# ───── Load Pre-trained Model and Scaler ───── #
-diabetes_model = load_model("backend/diabetes_model.sav")
-try:
-    import pickle
-    diabetes_scaler = pickle.load(open("backend/diabetes_scaler.sav", 'rb'))
-except:
-    diabetes_scaler = None
-    if LANG == 'en':
-        st.warning("⚠️ Scaler not found. Predictions may be less accurate.")
-    else:
-        st.warning("⚠️ स्केलर सापडले नाही. अंदाज कमी अचूक असू शकतात.")
+# ───── Attach to Shared Model Store ───── #
+diabetes_predictor = load_predictor("diabetes")
 
 # ──────────────🎨 Custom Styling────────────────────────── #
 apply_common_styling()
@@ -218,22 +211,17 @@ if st.button(L('submit_btn'), type="primary", use_container_width=True):
     features = pd.DataFrame([[pregnancies, glucose, blood_pressure, skin_thickness, 
                           insulin, bmi, diabetes_pedigree, age]], columns=feature_names)
     
-    # Apply scaling if scaler is available
-    if diabetes_scaler is not None:
-        features_scaled = diabetes_scaler.transform(features)
-    else:
-        features_scaled = features
-    
     # Get model prediction
     try:
-        prediction = diabetes_model.predict(features_scaled)[0]
-        prediction_proba = diabetes_model.predict_proba(features_scaled)[0]
-        risk_percentage = prediction_proba[1] * 100 if len(prediction_proba) > 1 else 0
+        # Scaling is applied inside the predictor
+        inference_start = time.perf_counter()
+        risk_percentage = float(diabetes_predictor.predict_proba(features.to_numpy())[0]) * 100
+        inference_ms = (time.perf_counter() - inference_start) * 1000
     except Exception as e:
         err_msg = get_text("error", LANG) + str(e)
         st.error(f"❌ {err_msg}")
-        prediction = None
         risk_percentage = 0
+        inference_ms = None
     
     # Create assessment prompt
     assessment_prompt = f"""
@@ -273,11 +261,30 @@ Please provide:
     if LANG == "mr":
          assessment_prompt += "\nImportant: Response MUST be in Marathi language."
 
+    # Identical resubmissions reuse the stored assessment instead of calling the LLM again
+    cache_key = prediction_cache_key("diabetes", diabetes_predictor.version, features.to_numpy()[0], LANG, assessment_prompt)
+    cached = prediction_cache.get(cache_key)
+
     with st.spinner(L('analyzing')):
-        assessment = call_openai_api(client, assessment_prompt, openrouter_model, timeout=30)
+        if cached:
+            assessment = cached["assessment"]
+            risk_percentage = cached["risk_percentage"]
+        else:
+            # Show the assessment as it streams in; the results section below re-renders it in full
+            stream_box = st.empty()
+            stream = call_openai_api(client, assessment_prompt, openrouter_model, timeout=30, stream=True)
+            with stream_box.container():
+                assessment = st.write_stream(stream)
+            stream_box.empty()
+            # An answer cut off by an error is neither cached, logged nor kept as the result
+            if not stream.complete:
+                assessment = None
+            if assessment:
+                prediction_cache.set(cache_key, {"risk_percentage": risk_percentage, "assessment": assessment})
         if assessment:
             st.session_state.assessment = assessment
             st.session_state.risk_percentage = risk_percentage
+            st.session_state.cache_key = cache_key
             
             # LOG PREDICTION TO DATABASE
             try:
@@ -291,7 +298,9 @@ Please provide:
                     'SkinThickness': skin_thickness, 'Insulin': insulin, 'BMI': bmi,
                     'DiabetesPedigreeFunction': diabetes_pedigree, 'Age': age
                 }
-                log_prediction(email, "Diabetes", feature_dict, f"{risk_percentage:.1f}% Risk")
+                log_prediction(email, "Diabetes", feature_dict, f"{risk_percentage:.1f}% Risk",
+                               risk_pct=round(risk_percentage, 1), model_version=diabetes_predictor.version,
+                               latency_ms=inference_ms)
             except Exception as log_err:
                 st.error(f"Note: Could not log prediction result: {log_err}")
                 
@@ -324,12 +333,13 @@ if st.session_state.get("assessment"):
     st.write(st.session_state.assessment)
     
     # Generate PDF Report
-    pdf_bytes = generate_pdf_report(
+    patient_info = f"Age: {age}, Sex: {sex}, Glucose: {glucose}"
+    pdf_bytes = cached_pdf(st.session_state.get("cache_key"), patient_info, lambda: generate_pdf_report(
         content=st.session_state.assessment,
         risk_pct=risk_pct,
         title=L('title'),
-        patient_info=f"Age: {age}, Sex: {sex}, Glucose: {glucose}"
-    )
+        patient_info=patient_info
+    ))
 
     # Download button
     st.download_button(
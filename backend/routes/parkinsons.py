@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 import os
 import sys
+import time
 import warnings
 from dotenv import load_dotenv
 
@@ -12,7 +13,8 @@ warnings.filterwarnings("ignore", message=".*unpickle estimator.*")
 
 # Add parent directory to path for importing utils
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import apply_common_styling, apply_button_styling, render_navbar, load_model, get_openai_client, get_model_name, call_openai_api, render_risk_meter, generate_pdf_report, get_language
+from utils import apply_common_styling, apply_button_styling, render_navbar, load_predictor, get_openai_client, get_model_name, call_openai_api, render_risk_meter, generate_pdf_report, get_language
+from backend.cache import prediction_cache, prediction_cache_key, cached_pdf
 
 # Get current language
 LANG = get_language()
@@ -135,14 +137,8 @@ except ValueError as e:
     st.error(f"Configuration Error: {str(e)}. Please set OPENROUTER_API_KEY in environment.")
     st.stop()
 
-# ───── Load Pre-trained Model and Scaler ───── #
-parkinsons_model = load_model("backend/parkinsons_model.sav")
-try:
-    import pickle
-    parkinsons_scaler = pickle.load(open("backend/parkinsons_scaler.sav", 'rb'))
-except:
-    parkinsons_scaler = None
-    st.warning("⚠️ Scaler not found. Predictions may be less accurate.")
+# ───── Attach to Shared Model Store ───── #
+parkinsons_predictor = load_predictor("parkinsons")
 
 # ──────────────🎨 Custom Styling────────────────────────── #
 apply_common_styling()
@@ -340,21 +336,16 @@ if st.button(L('submit_btn'), type="primary", use_container_width=True):
                           shimmer_apq3, shimmer_apq5, mdvp_apq, shimmer_dda, nhr, hnr,
                           rpde, dfa, spread1, spread2, d2, ppe]], columns=feature_names)
     
-    # Apply scaling if scaler is available
-    if parkinsons_scaler is not None:
-        features_scaled = parkinsons_scaler.transform(features)
-    else:
-        features_scaled = features
-    
     # Get model prediction
     try:
-        prediction = parkinsons_model.predict(features_scaled)[0]
-        prediction_proba = parkinsons_model.predict_proba(features_scaled)[0]
-        risk_percentage = prediction_proba[1] * 100 if len(prediction_proba) > 1 else 0
+        # Scaling is applied inside the predictor
+        inference_start = time.perf_counter()
+        risk_percentage = float(parkinsons_predictor.predict_proba(features.to_numpy())[0]) * 100
+        inference_ms = (time.perf_counter() - inference_start) * 1000
     except Exception as e:
         st.error(f"❌ Error in model prediction: {e}")
-        prediction = None
         risk_percentage = 0
+        inference_ms = None
     
     # Create assessment prompt
     assessment_prompt = f"""
@@ -405,11 +396,30 @@ Important: This is NOT a medical diagnosis. Voice analysis is a screening tool o
 Keep the response clear, actionable, and between 400-600 words.
 """
     
+    # Identical resubmissions reuse the stored assessment instead of calling the LLM again
+    cache_key = prediction_cache_key("parkinsons", parkinsons_predictor.version, features.to_numpy()[0], LANG, assessment_prompt)
+    cached = prediction_cache.get(cache_key)
+
     with st.spinner(L('analyzing')):
-        assessment = call_openai_api(client, assessment_prompt, openrouter_model, timeout=30)
+        if cached:
+            assessment = cached["assessment"]
+            risk_percentage = cached["risk_percentage"]
+        else:
+            # Show the assessment as it streams in; the results section below re-renders it in full
+            stream_box = st.empty()
+            stream = call_openai_api(client, assessment_prompt, openrouter_model, timeout=30, stream=True)
+            with stream_box.container():
+                assessment = st.write_stream(stream)
+            stream_box.empty()
+            # An answer cut off by an error is neither cached, logged nor kept as the result
+            if not stream.complete:
+                assessment = None
+            if assessment:
+                prediction_cache.set(cache_key, {"risk_percentage": risk_percentage, "assessment": assessment})
         if assessment:
             st.session_state.assessment = assessment
             st.session_state.risk_percentage = risk_percentage
+            st.session_state.cache_key = cache_key
             
             # LOG PREDICTION TO DATABASE
             try:
@@ -417,7 +427,9 @@ Keep the response clear, actionable, and between 400-600 words.
                 from utils import get_email
                 email = get_email()
                 # Log full features for retraining pipeline
-                log_prediction(email, "Parkinson's", features.to_dict(orient='records')[0], f"{risk_percentage:.1f}% Risk")
+                log_prediction(email, "Parkinson's", features.to_dict(orient='records')[0], f"{risk_percentage:.1f}% Risk",
+                               risk_pct=round(risk_percentage, 1), model_version=parkinsons_predictor.version,
+                               latency_ms=inference_ms)
             except Exception as log_err:
                 pass
                 
@@ -435,12 +447,13 @@ if st.session_state.get("assessment"):
     
     render_risk_meter(risk_pct)
     
-    pdf_bytes = generate_pdf_report(
+    patient_info = f"Age: {age}, Sex: {sex}"
+    pdf_bytes = cached_pdf(st.session_state.get("cache_key"), patient_info, lambda: generate_pdf_report(
         content=st.session_state.assessment,
         risk_pct=risk_pct,
         title=L('title'),
-        patient_info=f"Age: {age}, Sex: {sex}"
-    )
+        patient_info=patient_info
+    ))
 
     st.markdown(L('summary_header'))
     st.write(st.session_state.assessment)
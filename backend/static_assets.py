@@ -0,0 +1,240 @@
+"""
+Fingerprinted, precompressed static assets.
+
+`python -m backend.static_assets` builds frontend/ into frontend_dist/:
+every asset except HTML is written as name.<hash>.ext, gzip and brotli
+variants are precomputed for text files, and references in HTML and CSS are
+rewritten to the hashed names. `brotli` is listed in the requirements; a
+build without it still works but only writes gzip variants, and says so.
+A manifest.json records each URL path with its file, ETag and variants.
+
+`PrecompressedStaticFiles` serves a build: it picks the best variant for
+the request's Accept-Encoding, answers If-None-Match with 304, marks hashed
+files immutable for a year and makes HTML revalidate on every load, so
+repeat visits transfer almost nothing.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from starlette.responses import FileResponse, PlainTextResponse, Response
+
+try:
+    import brotli
+except ImportError:  # optional; gzip variants are always built
+    brotli = None
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_SRC_DIR = os.path.join(PROJECT_ROOT, "frontend")
+STATIC_DIST_DIR = os.getenv("STATIC_DIST_DIR", os.path.join(PROJECT_ROOT, "frontend_dist"))
+MANIFEST_NAME = "manifest.json"
+
+# Files that are copied but never fingerprinted (their URLs are what users see)
+UNHASHED_EXTENSIONS = {".html"}
+COMPRESSIBLE_EXTENSIONS = {".html", ".css", ".js", ".svg", ".json", ".txt", ".ico"}
+SKIPPED_EXTENSIONS = {".bak"}
+# Variants smaller than this fraction of the original are not worth serving
+MIN_COMPRESSION_RATIO = 0.95
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# src="..." / href="..." attributes and CSS url(...) references
+_HTML_REF = re.compile(r'''(?P<attr>\b(?:src|href)=)(?P<quote>["'])(?P<ref>[^"'#]+?)(?P=quote)''')
+_CSS_URL = re.compile(r'''url\(\s*(?P<quote>["']?)(?P<ref>[^"')]+?)(?P=quote)\s*\)''')
+
+
+# ─────────────── Build ─────────────── #
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _hashed_name(rel_path, digest):
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest[:10]}{ext}"
+
+
+def _resolve_ref(ref, base_dir, mapping):
+    """Map a relative reference to its hashed path, keeping the query string out."""
+    if re.match(r"^[a-z]+:|^//|^data:", ref, re.I):
+        return None
+    path = ref.split("?", 1)[0]
+    prefix = "./" if path.startswith("./") else ""
+    target = os.path.normpath(os.path.join(base_dir, path)).replace(os.sep, "/")
+    hashed = mapping.get(target)
+    if hashed is None:
+        return None
+    return prefix + os.path.relpath(hashed, base_dir or ".").replace(os.sep, "/")
+
+
+def _rewrite(text, pattern, base_dir, mapping):
+    def replace(match):
+        new_ref = _resolve_ref(match.group("ref"), base_dir, mapping)
+        if new_ref is None:
+            return match.group(0)
+        start, end = match.span("ref")
+        offset = match.start()
+        whole = match.group(0)
+        return whole[:start - offset] + new_ref + whole[end - offset:]
+    return pattern.sub(replace, text)
+
+
+def _write_variants(path, data):
+    """Write .gz/.br siblings that are meaningfully smaller; return their encodings."""
+    encodings = []
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data) * MIN_COMPRESSION_RATIO:
+        with open(path + ".gz", "wb") as f:
+            f.write(gz)
+        encodings.append("gzip")
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data) * MIN_COMPRESSION_RATIO:
+            with open(path + ".br", "wb") as f:
+                f.write(br)
+            encodings.append("br")
+    return encodings
+
+
+def build(src_dir=STATIC_SRC_DIR, dist_dir=STATIC_DIST_DIR):
+    """
+    Build a fingerprinted, precompressed copy of src_dir in dist_dir.
+
+    Returns:
+        The manifest dict that was written
+    """
+    sources = []
+    for root, _, files in os.walk(src_dir):
+        for name in files:
+            rel = os.path.relpath(os.path.join(root, name), src_dir).replace(os.sep, "/")
+            if os.path.splitext(name)[1].lower() not in SKIPPED_EXTENSIONS:
+                sources.append(rel)
+
+    # Binary assets first, then CSS (which may reference them), then JS, then HTML
+    def order(rel):
+        ext = os.path.splitext(rel)[1].lower()
+        return {".css": 1, ".js": 2, ".html": 3}.get(ext, 0), rel
+
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    mapping, files = {}, {}
+    for rel in sorted(sources, key=order):
+        with open(os.path.join(src_dir, rel), "rb") as f:
+            data = f.read()
+        ext = os.path.splitext(rel)[1].lower()
+        base_dir = os.path.dirname(rel)
+        if ext == ".css":
+            data = _rewrite(data.decode("utf-8"), _CSS_URL, base_dir, mapping).encode("utf-8")
+        elif ext == ".html":
+            text = _rewrite(data.decode("utf-8"), _HTML_REF, base_dir, mapping)
+            data = _rewrite(text, _CSS_URL, base_dir, mapping).encode("utf-8")
+
+        digest = _sha256(data)
+        out_rel = rel if ext in UNHASHED_EXTENSIONS else _hashed_name(rel, digest)
+        out_path = os.path.join(dist_dir, out_rel)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        with open(out_path, "wb") as f:
+            f.write(data)
+        encodings = _write_variants(out_path, data) if ext in COMPRESSIBLE_EXTENSIONS else []
+
+        entry = {"file": out_rel, "etag": digest[:32], "encodings": encodings}
+        files[out_rel] = dict(entry, immutable=out_rel != rel)
+        if out_rel != rel:
+            # The original URL still works, but must be revalidated
+            mapping[rel] = out_rel
+            files[rel] = dict(entry, immutable=False)
+
+    manifest = {"files": files}
+    with open(os.path.join(dist_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+# ─────────────── Serve ─────────────── #
+def _accepted_encodings(header):
+    """Encodings the client accepts (q > 0)."""
+    accepted = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        if token and q > 0:
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles:
+    """ASGI app serving a build produced by build(), like StaticFiles(html=True)."""
+
+    def __init__(self, directory=STATIC_DIST_DIR):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as f:
+            self.files = json.load(f)["files"]
+
+    def _lookup(self, path):
+        path = path.lstrip("/")
+        if path == "" or path.endswith("/"):
+            path += "index.html"
+        entry = self.files.get(path)
+        if entry is None and "." not in os.path.basename(path):
+            entry = self.files.get(path + "/index.html") or self.files.get(path + ".html")
+        return entry
+
+    async def __call__(self, scope, receive, send):
+        assert scope["type"] == "http"
+        if scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405)
+            await response(scope, receive, send)
+            return
+
+        entry = self._lookup(scope["path"])
+        if entry is None:
+            response = PlainTextResponse("Not Found", status_code=404)
+            await response(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        accepted = _accepted_encodings(headers.get("accept-encoding", ""))
+        encoding = next((e for e in ("br", "gzip") if e in entry["encodings"] and e in accepted), None)
+
+        etag = f'"{entry["etag"]}{"-" + encoding if encoding else ""}"'
+        response_headers = {
+            "etag": etag,
+            "cache-control": IMMUTABLE_CACHE_CONTROL if entry["immutable"] else REVALIDATE_CACHE_CONTROL,
+        }
+        if entry["encodings"]:
+            response_headers["vary"] = "Accept-Encoding"
+
+        if_none_match = headers.get("if-none-match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            response = Response(status_code=304, headers=response_headers)
+            await response(scope, receive, send)
+            return
+
+        path = os.path.join(self.directory, entry["file"])
+        if encoding:
+            path += {"br": ".br", "gzip": ".gz"}[encoding]
+            response_headers["content-encoding"] = encoding
+        media_type = mimetypes.guess_type(entry["file"])[0] or "application/octet-stream"
+        response = FileResponse(path, media_type=media_type, headers=response_headers)
+        await response(scope, receive, send)
+
+
+def has_build(directory=STATIC_DIST_DIR):
+    return os.path.isfile(os.path.join(directory, MANIFEST_NAME))
+
+
+if __name__ == "__main__":
+    manifest = build()
+    hashed = sum(1 for entry in manifest["files"].values() if entry["immutable"])
+    print(f"Built {hashed} fingerprinted assets into {STATIC_DIST_DIR}"
+          f"{'' if brotli else ' (brotli is not installed: only gzip variants were built)'}")
@@ -0,0 +1,336 @@
+"""
+Process supervisor for the Streamlit apps.
+
+Starts every app once per host, health-checks each replica over HTTP
+(/_stcore/health), and restarts replicas that exit or stop answering, with
+exponential backoff. Only one supervisor runs per host: it binds a control
+port first and serves its status there, so a second instance (e.g. started
+by another uvicorn worker) exits immediately.
+
+The supervisor owns the apps' lifetime. API workers only start it when it is
+missing and never stop it, so recycling or reloading one worker leaves the
+apps running. When started with --owner-pid (the API does this with the pid
+of its uvicorn manager process) it shuts down once that process is gone;
+without it, it runs until signalled, e.g. as its own service.
+
+Replica r of an app listens on the app's base port + r * STREAMLIT_REPLICA_PORT_STRIDE,
+so replica 0 keeps the ports the frontend links to (8501-8504).
+
+Usage:
+    python -m backend.supervisor
+    python -m backend.supervisor --owner-pid 1234
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SUPERVISOR_HOST = os.getenv("SUPERVISOR_HOST", "127.0.0.1")
+SUPERVISOR_PORT = int(os.getenv("SUPERVISOR_PORT", "8590"))
+STREAMLIT_REPLICAS = int(os.getenv("STREAMLIT_REPLICAS", "1"))
+STREAMLIT_REPLICA_PORT_STRIDE = int(os.getenv("STREAMLIT_REPLICA_PORT_STRIDE", "100"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+# Consecutive failed checks before a running replica is restarted
+HEALTH_CHECK_FAILURES = int(os.getenv("HEALTH_CHECK_FAILURES", "3"))
+# Time a fresh replica gets to come up before checks count against it
+STARTUP_GRACE_SECONDS = float(os.getenv("STARTUP_GRACE_SECONDS", "30"))
+RESTART_BACKOFF_BASE = float(os.getenv("RESTART_BACKOFF_BASE", "1"))
+RESTART_BACKOFF_MAX = float(os.getenv("RESTART_BACKOFF_MAX", "60"))
+# A replica healthy for this long has its backoff reset
+RESTART_BACKOFF_RESET = float(os.getenv("RESTART_BACKOFF_RESET", "60"))
+
+APPS = [
+    ("heart", "backend/routes/heart.py", 8501),
+    ("diabetes", "backend/routes/diabetes.py", 8502),
+    ("parkinsons", "backend/routes/parkinsons.py", 8503),
+    ("bot", "backend/routes/bot.py", 8504),
+]
+
+
+# ─────────────── Managed Replica ─────────────── #
+class Replica:
+    """One Streamlit process and its health and restart bookkeeping."""
+
+    def __init__(self, name, app_path, port, index):
+        self.name = name
+        self.app_path = os.path.join(PROJECT_ROOT, app_path)
+        self.port = port
+        self.index = index
+        self.process = None
+        self.state = "stopped"
+        self.started_at = None
+        self.healthy_since = None
+        self.failures = 0
+        self.restarts = 0
+        self.backoff_step = 0
+        self.next_start = 0.0
+        self.last_error = None
+
+    def start(self):
+        logger.info(f"Starting {self.name}[{self.index}] on port {self.port}")
+        try:
+            self.process = subprocess.Popen([
+                sys.executable, "-m", "streamlit", "run", self.app_path,
+                "--server.port", str(self.port),
+                "--server.headless", "true"
+            ], cwd=PROJECT_ROOT)
+        except Exception as e:
+            self.last_error = f"Failed to start: {e}"
+            logger.error(f"Failed to start {self.name}[{self.index}]: {e}")
+            self._schedule_restart()
+            return
+        self.state = "starting"
+        self.started_at = time.monotonic()
+        self.healthy_since = None
+        self.failures = 0
+
+    def stop(self):
+        if self.process is None or self.process.poll() is not None:
+            self.state = "stopped"
+            return
+        try:
+            self.process.terminate()
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            logger.warning(f"{self.name}[{self.index}] killed")
+        self.state = "stopped"
+
+    def _schedule_restart(self):
+        delay = min(RESTART_BACKOFF_MAX, RESTART_BACKOFF_BASE * 2 ** self.backoff_step)
+        self.backoff_step += 1
+        self.next_start = time.monotonic() + delay
+        self.state = "backoff"
+        logger.warning(f"Restarting {self.name}[{self.index}] in {delay:g}s ({self.last_error})")
+
+    def _health_ok(self):
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=HEALTH_CHECK_TIMEOUT) as response:
+                return response.status == 200
+        except Exception:
+            return False
+
+    def check(self):
+        """Advance the replica's state machine by one health-check tick."""
+        now = time.monotonic()
+        if self.state == "backoff":
+            if now >= self.next_start:
+                self.restarts += 1
+                self.start()
+            return
+        if self.state == "stopped":
+            return
+
+        exit_code = self.process.poll()
+        if exit_code is not None:
+            self.last_error = f"Exited with code {exit_code}"
+            self._schedule_restart()
+            return
+
+        if self._health_ok():
+            self.failures = 0
+            if self.state != "healthy":
+                self.healthy_since = now
+            self.state = "healthy"
+            if now - self.healthy_since >= RESTART_BACKOFF_RESET:
+                self.backoff_step = 0
+            return
+
+        if self.state == "starting" and now - self.started_at < STARTUP_GRACE_SECONDS:
+            return
+        self.failures += 1
+        self.state = "unhealthy"
+        if self.failures >= HEALTH_CHECK_FAILURES:
+            self.last_error = f"Failed {self.failures} health checks"
+            self.stop()
+            self._schedule_restart()
+
+    def status(self):
+        return {
+            "app": self.name,
+            "replica": self.index,
+            "port": self.port,
+            "pid": self.process.pid if self.process and self.process.poll() is None else None,
+            "state": self.state,
+            "restarts": self.restarts,
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+# ─────────────── Owner Process ─────────────── #
+def pid_alive(pid):
+    """Whether a process with this pid is still running."""
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows, so ask the kernel instead
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        try:
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))) and exit_code.value == 259
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def api_owner_pid():
+    """
+    Pid whose lifetime the Streamlit apps should follow when started by the API.
+
+    uvicorn's --workers and --reload managers start workers with
+    multiprocessing, so a worker's multiprocessing parent is the manager,
+    which outlives worker restarts and reloads. A single-process server is
+    its own owner.
+    """
+    import multiprocessing
+    parent = multiprocessing.parent_process()
+    return parent.pid if parent is not None else os.getpid()
+
+
+# ─────────────── Supervisor ─────────────── #
+class Supervisor:
+    def __init__(self, replicas=STREAMLIT_REPLICAS, owner_pid=None):
+        self.replicas = [
+            Replica(name, path, port + i * STREAMLIT_REPLICA_PORT_STRIDE, i)
+            for name, path, port in APPS
+            for i in range(replicas)
+        ]
+        self.owner_pid = owner_pid
+        self.started = time.time()
+        self._stop = threading.Event()
+
+    def status(self):
+        # Read without locking so status never waits on a slow health check
+        return {
+            "pid": os.getpid(),
+            "owner_pid": self.owner_pid,
+            "uptime_seconds": round(time.time() - self.started),
+            "apps": [replica.status() for replica in self.replicas],
+        }
+
+    def run(self):
+        for replica in self.replicas:
+            replica.start()
+        while not self._stop.wait(HEALTH_CHECK_INTERVAL):
+            if self.owner_pid is not None and not pid_alive(self.owner_pid):
+                logger.info(f"Owner process {self.owner_pid} has exited; stopping the Streamlit apps")
+                break
+            for replica in self.replicas:
+                replica.check()
+        for replica in self.replicas:
+            replica.stop()
+
+    def stop(self, *_):
+        self._stop.set()
+
+
+def _status_server(supervisor):
+    """Bind the control port; raises OSError if another supervisor holds it."""
+
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/status":
+                self.send_error(404)
+                return
+            body = json.dumps(supervisor.status()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class StatusServer(ThreadingHTTPServer):
+        # Binding must fail while another supervisor listens on the port. On POSIX,
+        # SO_REUSEADDR only skips TIME_WAIT; on Windows it would allow a second
+        # listener, so an exclusive bind is used there instead.
+        allow_reuse_address = os.name != "nt"
+        daemon_threads = True
+
+        def server_bind(self):
+            if os.name == "nt":
+                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+            super().server_bind()
+
+    return StatusServer((SUPERVISOR_HOST, SUPERVISOR_PORT), StatusHandler)
+
+
+# ─────────────── Client Helpers ─────────────── #
+def get_status(timeout=1.0):
+    """Status reported by the running supervisor, or None if none is reachable."""
+    try:
+        with urllib.request.urlopen(f"http://{SUPERVISOR_HOST}:{SUPERVISOR_PORT}/status", timeout=timeout) as response:
+            return json.load(response)
+    except Exception:
+        return None
+
+
+def spawn_if_absent(owner_pid=None):
+    """
+    Start a detached supervisor unless one already answers on the control port.
+
+    Concurrent callers (one per uvicorn worker) may each spawn one; all but
+    the first to bind the control port exit straight away. The caller must not
+    stop the returned process: the supervisor stops itself when owner_pid exits.
+
+    Returns:
+        The spawned Popen handle, or None if a supervisor was already running
+    """
+    if get_status() is not None:
+        return None
+    detach = (
+        {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        if os.name == "nt" else {"start_new_session": True}
+    )
+    command = [sys.executable, "-m", "backend.supervisor"]
+    if owner_pid is not None:
+        command += ["--owner-pid", str(owner_pid)]
+    return subprocess.Popen(command, cwd=PROJECT_ROOT, **detach)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Start and watch the Streamlit apps")
+    parser.add_argument("--owner-pid", type=int, help="Stop the apps and exit once this process is gone")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    supervisor = Supervisor(owner_pid=args.owner_pid)
+    try:
+        server = _status_server(supervisor)
+    except OSError:
+        logger.info(f"Control port {SUPERVISOR_PORT} is taken, another supervisor is running; exiting")
+        return 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    signal.signal(signal.SIGTERM, supervisor.stop)
+    signal.signal(signal.SIGINT, supervisor.stop)
+    logger.info(f"Supervisor {os.getpid()} managing {len(supervisor.replicas)} Streamlit replicas")
+    supervisor.run()
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Prompt token budgeting for the chatbot.
+
+The system prompt and the most recent messages are sent verbatim; older
+messages are folded into a short running summary appended to the system
+prompt, so prompt size (and with it latency and cost) stays bounded however
+long a session runs. Folding is incremental: each message is summarized once
+and the summary state lives in the caller's session.
+
+Token counts use tiktoken when it is installed and a ~4 characters per token
+estimate otherwise, which is close enough for budgeting.
+"""
+import math
+import os
+import re
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # optional dependency; get_encoding may also need a download
+    _ENCODING = None
+
+# Total prompt budget: system prompt + summary + verbatim messages
+CHAT_PROMPT_MAX_TOKENS = int(os.getenv("CHAT_PROMPT_MAX_TOKENS", "3000"))
+# Upper bound on messages kept verbatim, even when they would fit
+CHAT_KEEP_RECENT_MESSAGES = int(os.getenv("CHAT_KEEP_RECENT_MESSAGES", "8"))
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "500"))
+
+# Chat-format overhead per message (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_HEADER = "\n\nSummary of the earlier conversation:\n"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def estimate_tokens(text):
+    """Approximate token count of a piece of text."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def message_tokens(message):
+    return estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _gist(text, max_chars):
+    """First sentence of a message, cut to max_chars."""
+    text = _WHITESPACE.sub(" ", text or "").strip()
+    text = _SENTENCE_END.split(text, 1)[0]
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + "…"
+
+
+def _summary_line(message):
+    # User questions carry the thread of the conversation; answers are cut harder
+    if message.get("role") == "user":
+        return f"- User asked: {_gist(message.get('content'), 200)}"
+    return f"- Assistant answered: {_gist(message.get('content'), 120)}"
+
+
+def new_budget_state():
+    """State to keep in the session between turns."""
+    return {"folded": 0, "summary": []}
+
+
+def compact_history(messages, system_prompt, state, max_tokens=CHAT_PROMPT_MAX_TOKENS,
+                    keep_recent=CHAT_KEEP_RECENT_MESSAGES, summary_max_tokens=CHAT_SUMMARY_MAX_TOKENS):
+    """
+    Fit a conversation into the prompt budget.
+
+    Args:
+        messages: Full conversation (user/assistant messages, oldest first)
+        system_prompt: System instructions, always kept verbatim
+        state: Dict from new_budget_state(), updated in place
+        max_tokens: Budget for the whole prompt
+        keep_recent: Most messages to keep verbatim
+        summary_max_tokens: Budget for the running summary
+
+    Returns:
+        (system_prompt, messages) to send: the system prompt with the
+        summary appended, and the recent messages
+    """
+    # Newest messages first, within both the message cap and the token budget
+    available = max_tokens - estimate_tokens(system_prompt) - summary_max_tokens - MESSAGE_OVERHEAD_TOKENS
+    start = len(messages)
+    used = 0
+    while start > state["folded"] and len(messages) - start < keep_recent:
+        cost = message_tokens(messages[start - 1])
+        # The latest message is always sent, even if it alone exceeds the budget
+        if used + cost > available and start < len(messages):
+            break
+        used += cost
+        start -= 1
+
+    # Fold messages that just left the verbatim window
+    for message in messages[state["folded"]:start]:
+        state["summary"].append(_summary_line(message))
+    state["folded"] = max(state["folded"], start)
+
+    # Oldest summary lines are dropped first once the summary is over budget
+    summary = state["summary"]
+    while summary and estimate_tokens("\n".join(summary)) > summary_max_tokens:
+        summary.pop(0)
+
+    if summary:
+        system_prompt = system_prompt + SUMMARY_HEADER + "\n".join(summary)
+    return system_prompt, messages[state["folded"]:]
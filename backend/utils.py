@@ -4,19 +4,25 @@ Centralizes common styling, model loading, and API setup.
 """
 import streamlit as st
 import os
-from openai import OpenAI
+import sys
+import re
+import time
+from functools import lru_cache
+from fpdf import FPDF
+
+# Make the `backend` package importable when a route is started with `streamlit run`
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.llm_cache import llm_cache, LLM_CACHE_ENABLED
+from backend.llm_client import get_llm_client, LLMError
+from backend.metrics import DB_QUERY_SECONDS, LLM_REQUESTS, PDF_RENDER_SECONDS
 
 # ─────────────── API Configuration ─────────────── #
 def get_openai_client():
-    """Get OpenAI/OpenRouter client with API key from environment."""
-    api_key = os.getenv("OPENROUTER_API_KEY")
-    if not api_key:
-        raise ValueError("OPENROUTER_API_KEY not set in environment variables")
-    
-    return OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=api_key
-    )
+    """Get the process-wide OpenRouter client (pooled, rate-limited, with retries)."""
+    return get_llm_client()
 
 def get_model_name():
     """Get the model name from environment, default to deepseek."""
@@ -91,6 +97,25 @@ def load_model(model_path):
     import joblib
     return joblib.load(model_path)
 
+def load_predictor(name):
+    """
+    Get the live predictor for a model from the shared model registry.
+    
+    Not wrapped in st.cache_resource: the registry keeps its own per-process
+    cache and hot-swaps to newly promoted versions, which a Streamlit cache
+    would pin. Compiled models are memory-mapped read-only, so every
+    Streamlit and API process on the host shares one copy of the arrays.
+    Scaling is applied inside the predictor.
+    
+    Args:
+        name: Model key ("heart", "diabetes" or "parkinsons")
+        
+    Returns:
+        backend.inference.Predictor
+    """
+    from backend.registry import get_predictor
+    return get_predictor(name)
+
 # ─────────────── Localization ─────────────── #
 TRANSLATIONS = {
     "en": {
@@ -150,26 +175,34 @@ def get_text(key, lang=None):
     return TRANSLATIONS.get(lang, TRANSLATIONS["en"]).get(key, key)
 
 # ─────────────── API Call Wrapper ─────────────── #
-def call_openai_api(client, prompt=None, model=None, timeout=30, system_prompt=None, messages=None):
+def call_openai_api(client, prompt=None, model=None, timeout=30, system_prompt=None, messages=None, stream=False,
+                    use_cache=True, near_duplicate=False):
     """
     Make API call to OpenRouter with error handling and timeout.
     
     Args:
-        client: OpenAI client instance
+        client: Client from get_openai_client()
         prompt: Single prompt text (used if messages is None)
         model: Model name (uses default if None)
         timeout: Request timeout in seconds
         system_prompt: System instructions for the model
         messages: Full conversation history list
+        stream: Yield text chunks as they arrive instead of waiting for the
+            whole completion (pass the result to st.write_stream)
+        use_cache: Serve and store responses in the persistent LLM cache
+        near_duplicate: Also accept a cached answer to a similar final message
+            (for free-text questions, not for templated prompts)
         
     Returns:
-        API response content or None if error
+        API response content or None if error; with stream=True, a
+        CompletionStream of text chunks whose `complete` flag is False if the
+        stream failed before the model finished
     """
     if model is None:
         model = get_model_name()
     
+    lang = get_language()
     if system_prompt is None:
-        lang = get_language()
         system_prompt = "You are a helpful medical information assistant. Always remind users to consult healthcare professionals for medical advice."
         
         if lang == "mr":
@@ -190,17 +223,64 @@ def call_openai_api(client, prompt=None, model=None, timeout=30, system_prompt=N
             {"role": "user", "content": prompt}
         ]
     
+    use_cache = use_cache and LLM_CACHE_ENABLED
+    if use_cache:
+        with DB_QUERY_SECONDS.time(operation="llm_cache_lookup"):
+            cached = llm_cache.get(model, lang, system_prompt, final_messages, near_duplicate=near_duplicate)
+        if cached is not None:
+            LLM_REQUESTS.inc(outcome="cache_hit")
+            return CompletionStream([cached]) if stream else cached
+    on_complete = (lambda text: llm_cache.set(model, lang, system_prompt, final_messages, text)) if use_cache else None
+
+    if stream:
+        return CompletionStream(client.stream(model, final_messages, timeout=timeout), on_complete)
+
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=final_messages,
-            timeout=timeout
-        )
-        return response.choices[0].message.content
-    except Exception as e:
+        content = client.complete(model, final_messages, timeout=timeout)
+        if on_complete and content:
+            on_complete(content)
+        return content
+    except LLMError as e:
         print(f"API Error: {e}")
         return None
 
+class CompletionStream:
+    """
+    Iterator over completion text chunks as the API sends them (pass it to
+    st.write_stream).
+
+    Once exhausted, `complete` tells whether the model finished: an LLMError
+    part-way ends the iteration early, leaves `complete` False and stores the
+    exception in `error`, so callers can avoid caching or logging partial
+    text. on_complete gets the full text of a finished, non-empty answer.
+    """
+
+    def __init__(self, chunks, on_complete=None):
+        self.complete = False
+        self.error = None
+        self._iterator = self._generate(chunks, on_complete)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+    def _generate(self, chunks, on_complete):
+        parts = []
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        except LLMError as e:
+            print(f"API Error: {e}")
+            self.error = e
+            return
+        self.complete = True
+        # Only complete responses are cached
+        if on_complete and parts:
+            on_complete("".join(parts))
+
 def render_risk_meter(risk_percentage):
     """
     Render a visual risk meter (gauge) using HTML/CSS.
@@ -271,97 +351,106 @@ def render_risk_meter(risk_percentage):
     """
     st.markdown(meter_html, unsafe_allow_html=True)
 
-def generate_pdf_report(content, risk_pct, title="Start", patient_info="Not Provided"):
-    """
-    Generate a formatted PDF report with risk meter visualization.
-    """
-    from fpdf import FPDF
-    import io
-    import re
-    import os
-    
-    lang = get_language()
-    pdf_labels = {
-        "en": {
-            "subtitle": "Medical Risk Assessment AI",
-            "footer": "HealthPredict AI - Not a substitute for professional medical advice | Page ",
-            "risk_prob": "Risk Probability: "
-        },
-        "mr": {
-            "subtitle": "वैद्यकीय जोखीम मूल्यांकन एआय",
-            "footer": "HealthPredict AI - व्यावसायिक वैद्यकीय सल्ल्याचा पर्याय नाही | पृष्ठ ",
-            "risk_prob": "जोखीम शक्यता: "
-        }
+# ─────────────── PDF Reports ─────────────── #
+PDF_LABELS = {
+    "en": {
+        "subtitle": "Medical Risk Assessment AI",
+        "footer": "HealthPredict AI - Not a substitute for professional medical advice | Page ",
+        "risk_prob": "Risk Probability: "
+    },
+    "mr": {
+        "subtitle": "वैद्यकीय जोखीम मूल्यांकन एआय",
+        "footer": "HealthPredict AI - व्यावसायिक वैद्यकीय सल्ल्याचा पर्याय नाही | पृष्ठ ",
+        "risk_prob": "जोखीम शक्यता: "
     }
-    L_PDF = pdf_labels.get(lang, pdf_labels["en"])
-    # Clean L_PDF values
-    L_PDF = {k: "".join(c for c in v if ord(c) < 0x10000) for k, v in L_PDF.items()}
-
-    # 1. First, check and add Unicode font if needed
-    font_candidates = [
-        "C:\\Windows\\Fonts\\mangal.ttf",
-        "C:\\Windows\\Fonts\\kokila.ttf",
-        "C:\\Windows\\Fonts\\nirmala.ttf"
-    ]
-    
-    # Create a temporary PDF to check font loading
-    temp_pdf = FPDF()
-    has_unicode_font = False
-    active_font_path = None
-    for fp in font_candidates:
+}
+
+UNICODE_FONT_CANDIDATES = [
+    "C:\\Windows\\Fonts\\mangal.ttf",
+    "C:\\Windows\\Fonts\\kokila.ttf",
+    "C:\\Windows\\Fonts\\nirmala.ttf"
+]
+
+def clean_text_for_pdf(text):
+    """Strip characters not supported by the PDF fonts (like emojis above 0xFFFF)."""
+    if not text: return ""
+    return "".join(c for c in text if ord(c) < 0x10000)
+
+@lru_cache(maxsize=1)
+def find_unicode_font():
+    """Path of the first loadable Devanagari-capable font, discovered once per process."""
+    for fp in UNICODE_FONT_CANDIDATES:
         if os.path.exists(fp):
             try:
-                temp_pdf.add_font("MarathiFont", style="", fname=fp)
-                has_unicode_font = True
-                active_font_path = fp
-                break
-            except:
+                FPDF().add_font("MarathiFont", style="", fname=fp)
+                return fp
+            except Exception:
                 continue
+    return None
 
-    class PDF(FPDF):
-        def header(self):
-            # Banner color
-            self.set_fill_color(6, 6, 28) # #06061C dark blue
-            self.rect(0, 0, 210, 40, 'F')
-            
-            # Title
-            self.set_font('Arial', 'B', 24)
-            self.set_text_color(255, 255, 255) # White
-            self.cell(0, 20, "HealthPredict", 0, 1, 'C', False)
-            
-            # Subtitle
-            if lang == "mr" and has_unicode_font:
-                self.set_font("MarathiFont", "", 12)
-            else:
-                self.set_font('Arial', 'I', 12)
-            self.cell(0, 5, L_PDF["subtitle"], 0, 1, 'C', False)
-            self.ln(20)
-
-        def footer(self):
-            self.set_y(-15)
-            if lang == "mr" and has_unicode_font:
-                self.set_font("MarathiFont", "", 8)
-            else:
-                self.set_font('Arial', 'I', 8)
-            self.set_text_color(128, 128, 128)
-            self.cell(0, 10, L_PDF["footer"] + str(self.page_no()), 0, 0, 'C')
-
-    # Create PDF object
-    pdf = PDF()
-    if has_unicode_font:
-        pdf.add_font("MarathiFont", style="", fname=active_font_path)
+class ReportPDF(FPDF):
+    """Report template: dark banner header and page-numbered footer."""
+
+    def __init__(self, lang, font_path=None):
+        super().__init__()
+        self.lang = lang
+        self.labels = {k: clean_text_for_pdf(v) for k, v in PDF_LABELS.get(lang, PDF_LABELS["en"]).items()}
+        self.has_unicode_font = font_path is not None
+        if self.has_unicode_font:
+            self.add_font("MarathiFont", style="", fname=font_path)
+
+    def _label_font(self, size, style):
+        if self.lang == "mr" and self.has_unicode_font:
+            self.set_font("MarathiFont", "", size)
+        else:
+            self.set_font('Arial', style, size)
+
+    def header(self):
+        # Banner color
+        self.set_fill_color(6, 6, 28) # #06061C dark blue
+        self.rect(0, 0, 210, 40, 'F')
+        
+        # Title
+        self.set_font('Arial', 'B', 24)
+        self.set_text_color(255, 255, 255) # White
+        self.cell(0, 20, "HealthPredict", 0, 1, 'C', False)
+        
+        # Subtitle
+        self._label_font(12, 'I')
+        self.cell(0, 5, self.labels["subtitle"], 0, 1, 'C', False)
+        self.ln(20)
+
+    def footer(self):
+        self.set_y(-15)
+        self._label_font(8, 'I')
+        self.set_text_color(128, 128, 128)
+        self.cell(0, 10, self.labels["footer"] + str(self.page_no()), 0, 0, 'C')
+
+def generate_pdf_report(content, risk_pct, title="Start", patient_info="Not Provided"):
+    """
+    Generate a formatted PDF report with risk meter visualization.
+    Always renders; the assessment pages keep the bytes with their cached
+    prediction through backend.cache.cached_pdf.
+    """
+    start = time.perf_counter()
+    pdf_data = _render_pdf_report(content, risk_pct, title, patient_info, get_language())
+    PDF_RENDER_SECONDS.observe(time.perf_counter() - start, cache="miss")
+    return pdf_data
+
+def _render_pdf_report(content, risk_pct, title, patient_info, lang):
+    font_path = find_unicode_font()
+    has_unicode_font = font_path is not None
+    L_PDF = PDF_LABELS.get(lang, PDF_LABELS["en"])
+    L_PDF = {k: clean_text_for_pdf(v) for k, v in L_PDF.items()}
+
+    # fpdf2 fonts belong to one document, so the TTF is still parsed per render
+    pdf = ReportPDF(lang, font_path)
     
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
 
     
     # ─── REPORT TITLE ───
-    # Helper to strip characters not supported by standard fonts (like emojis)
-    def clean_text_for_pdf(text):
-        if not text: return ""
-        # Remove characters above 0xFFFF (emojis)
-        return "".join(c for c in text if ord(c) < 0x10000)
-
     title = clean_text_for_pdf(title)
     content = clean_text_for_pdf(content)
     patient_info = clean_text_for_pdf(patient_info)
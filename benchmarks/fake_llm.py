@@ -0,0 +1,139 @@
+"""
+Offline stand-in for the OpenRouter chat completions API.
+
+Answers POST /chat/completions (any prefix, e.g. /api/v1/chat/completions)
+with a canned assessment after a configurable delay, streaming it as SSE
+chunks when the request asks for a stream. Usage counts are reported, so the
+LLM token metrics see realistic numbers. Point the app at it with:
+
+    OPENROUTER_BASE_URL=http://127.0.0.1:8765/v1 OPENROUTER_API_KEY=fake
+
+Usage:
+    python -m benchmarks.fake_llm --port 8765 --latency 0.4 --chunk-delay 0.02
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_ANSWER = (
+    "### Summary\n"
+    "Based on the values provided, the estimated risk is shown above. "
+    "This is a screening estimate, not a diagnosis.\n"
+    "### Recommendations\n"
+    "- Keep a balanced diet and stay physically active.\n"
+    "- Review your results with a qualified healthcare professional.\n"
+)
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, latency=0.0, chunk_delay=0.0, answer=DEFAULT_ANSWER, chunk_words=3):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.answer = answer
+        self.chunk_words = chunk_words
+        self.requests = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; Nagle would hold the body for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        server.requests += 1
+        time.sleep(server.latency)
+
+        prompt_tokens = sum(len(str(m.get("content", ""))) // 4 + 4 for m in body.get("messages", []))
+        words = server.answer.split(" ")
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(server.answer) // 4,
+            "total_tokens": prompt_tokens + len(server.answer) // 4,
+        }
+        base = {"id": "fake-1", "created": int(time.time()), "model": body.get("model", "fake")}
+
+        if not body.get("stream"):
+            payload = json.dumps(dict(base, object="chat.completion", usage=usage, choices=[{
+                "index": 0, "finish_reason": "stop",
+                "message": {"role": "assistant", "content": server.answer},
+            }])).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            for i in range(0, len(words), server.chunk_words):
+                text = " ".join(words[i:i + server.chunk_words])
+                if i + server.chunk_words < len(words):
+                    text += " "
+                self._event(dict(base, object="chat.completion.chunk", choices=[{
+                    "index": 0, "delta": {"content": text}, "finish_reason": None,
+                }]))
+                time.sleep(server.chunk_delay)
+            self._event(dict(base, object="chat.completion.chunk", choices=[{
+                "index": 0, "delta": {}, "finish_reason": "stop",
+            }]))
+            if (body.get("stream_options") or {}).get("include_usage"):
+                self._event(dict(base, object="chat.completion.chunk", choices=[], usage=usage))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client cancelled the stream
+        self.close_connection = True
+
+    def _event(self, data):
+        self.wfile.write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+def start(host="127.0.0.1", port=0, **options):
+    """
+    Run a fake server on a daemon thread.
+
+    Returns:
+        The server; its base URL is f"http://{host}:{server.server_port}/v1"
+    """
+    server = FakeLLMServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, name="fake-llm", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first byte")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    args = parser.parse_args()
+    server = FakeLLMServer((args.host, args.port), latency=args.latency, chunk_delay=args.chunk_delay)
+    print(f"Fake LLM listening on http://{args.host}:{server.server_port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
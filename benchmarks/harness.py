@@ -0,0 +1,130 @@
+"""
+Timing, result files and baseline comparison for the benchmark suite.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(fn, repeat=20, number=1, warmup=1, items=1):
+    """
+    Time fn() `repeat` times, each sample averaging `number` back-to-back calls.
+
+    Args:
+        fn: Zero-argument callable to time
+        repeat: Number of samples
+        number: Calls per sample (raise for sub-millisecond operations)
+        warmup: Untimed calls made first
+        items: Units of work per call, for the throughput figure (e.g. rows)
+
+    Returns:
+        Dict of per-call statistics in milliseconds plus items per second
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    samples.sort()
+    median = statistics.median(samples)
+    return {
+        "median_ms": round(median * 1000, 4),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "min_ms": round(samples[0] * 1000, 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 4),
+        "stdev_ms": round(statistics.pstdev(samples) * 1000, 4),
+        "repeat": repeat,
+        "number": number,
+        "items_per_second": round(items / median, 1) if median > 0 else None,
+    }
+
+
+def environment():
+    """What the numbers depend on, stored next to them."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(path, results):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(current, baseline, tolerance=0.25):
+    """
+    Compare median times of benchmarks present in both runs.
+
+    Args:
+        current: Results dict from this run
+        baseline: Results dict to compare against
+        tolerance: Allowed slowdown as a fraction (0.25 = 25% slower)
+
+    Returns:
+        (rows, regressions): one row per benchmark as
+        (name, baseline_ms, current_ms, ratio, status), and the names that regressed
+    """
+    rows, regressions = [], []
+    base = baseline.get("benchmarks", {})
+    for name, result in sorted(current.get("benchmarks", {}).items()):
+        old = base.get(name)
+        if "median_ms" not in result:
+            rows.append((name, old.get("median_ms") if old else None, None, None, result.get("status", "skipped")))
+            continue
+        if not old or "median_ms" not in old:
+            rows.append((name, None, result["median_ms"], None, "new"))
+            continue
+        ratio = result["median_ms"] / old["median_ms"] if old["median_ms"] else None
+        if ratio is None:
+            status = "ok"
+        elif ratio > 1 + tolerance:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 / (1 + tolerance):
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, old["median_ms"], result["median_ms"], ratio, status))
+    return rows, regressions
+
+
+def format_table(rows):
+    def ms(value):
+        return "-" if value is None else f"{value:.3f}"
+
+    width = max([len(r[0]) for r in rows] + [9])
+    lines = [f"{'benchmark':<{width}}  {'baseline ms':>12}  {'current ms':>12}  {'ratio':>6}  status"]
+    for name, old, new, ratio, status in rows:
+        lines.append(
+            f"{name:<{width}}  {ms(old):>12}  {ms(new):>12}  "
+            f"{'-' if ratio is None else f'{ratio:.2f}':>6}  {status}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,401 @@
+"""
+Benchmark suite for the project's hot paths.
+
+Everything runs offline against throwaway SQLite databases in a temp
+directory; the LLM is served by benchmarks/fake_llm.py. Results are written
+as JSON and compared with a stored baseline (median time per benchmark).
+
+Usage:
+    python -m benchmarks.run                      # full run, compare with baseline.json
+    python -m benchmarks.run --quick              # smaller datasets and fewer samples
+    python -m benchmarks.run --only inference history
+    python -m benchmarks.run --save-baseline      # record this run as the new baseline
+    python -m benchmarks.run --check              # exit 1 if anything regressed
+
+Baselines are machine-specific; re-record one on the machine that runs the
+comparison before relying on --check.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks import fake_llm
+from benchmarks.harness import compare, environment, format_table, load_results, measure, write_results
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "latest.json")
+
+HISTORY_SIZES = (10, 1_000, 100_000)
+QUICK_HISTORY_SIZES = (10, 1_000)
+ADMIN_DATASET = {"users": 10_000, "predictions": 100_000}
+QUICK_ADMIN_DATASET = {"users": 1_000, "predictions": 10_000}
+
+BENCH_PASSWORD = "bench-password-123"
+ASSESSMENT_TYPES = {"heart": "Heart Disease", "diabetes": "Diabetes", "parkinsons": "Parkinson's"}
+
+REPORT_TEXT = {
+    "en": ("Heart Disease Risk Assessment", "Name: Bench Patient | Age: 54 | Sex: Male",
+           "### Summary\nYour estimated risk is moderate.\n## Key factors\n"
+           + "- Cholesterol and resting blood pressure are above the reference range.\n" * 20),
+    "mr": ("हृदयरोग जोखीम मूल्यांकन", "नाव: चाचणी रुग्ण | वय: 54",
+           "### सारांश\nतुमचा अंदाजित धोका मध्यम आहे.\n## मुख्य घटक\n"
+           + "- कोलेस्टेरॉल आणि रक्तदाब संदर्भ मर्यादेपेक्षा जास्त आहेत.\n" * 20),
+}
+
+
+# ─────────────── Environment ─────────────── #
+class Context:
+    """Temp directory, fake LLM and per-run options shared by the benchmark groups."""
+
+    def __init__(self, quick):
+        self.quick = quick
+        self.work_dir = tempfile.mkdtemp(prefix="healthpredict-bench-")
+        self.results = {}
+        self.llm = fake_llm.start()
+        self.rng = random.Random(42)
+        # Read by backend modules at import time, so set before any backend import
+        os.environ["METRICS_DIR"] = os.path.join(self.work_dir, "metrics")
+        os.environ["LLM_CACHE_PATH"] = os.path.join(self.work_dir, "llm_cache.db")
+        os.environ["STREAMLIT_AUTOSTART"] = "0"
+        os.environ["OPENROUTER_API_KEY"] = "fake"
+        os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{self.llm.server_port}/v1"
+        os.chdir(PROJECT_ROOT)  # main.py mounts frontend/ relative to the working directory
+        self._client = None
+
+    def record(self, group, name, result):
+        self.results[name] = dict(result, group=group)
+        print(f"  {name:<52} {result.get('median_ms', 0):>10.3f} ms"
+              if "median_ms" in result else f"  {name:<52} {result['status']}: {result.get('reason', '')}")
+
+    def samples(self, full, quick):
+        return quick if self.quick else full
+
+    @property
+    def client(self):
+        """FastAPI TestClient; startup events (model warm-up, supervisor) are not run."""
+        if self._client is None:
+            from fastapi.testclient import TestClient
+            from backend.main import app
+            self._client = TestClient(app)
+        return self._client
+
+    def use_database(self, name):
+        """Point backend.database at a fresh, migrated database file."""
+        from backend import database
+        database.flush_prediction_log()
+        database._pool.close_all()
+        database.DB_PATH = os.path.join(self.work_dir, f"{name}.db")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(database.DB_PATH + suffix):
+                os.remove(database.DB_PATH + suffix)
+        database.init_db()
+        return database.DB_PATH
+
+    def close(self):
+        from backend import database
+        database.flush_prediction_log()
+        database._pool.close_all()
+        self.llm.shutdown()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def _sample_features(rng, feature_names):
+    return {name: round(rng.uniform(0.1, 200.0), 3) for name in feature_names}
+
+
+def _password_hash():
+    from backend.main import get_password_hash
+    return get_password_hash(BENCH_PASSWORD)
+
+
+def populate(path, users, predictions, rng, focus_email=None, focus_rows=0):
+    """
+    Bulk-load synthetic users and predictions (triggers keep the rollups current).
+
+    Args:
+        path: Migrated database file
+        users: Number of background users
+        predictions: Predictions spread over the background users (and guests)
+        rng: random.Random for reproducible data
+        focus_email: Optional user that additionally gets focus_rows predictions
+    """
+    from backend.inference import MODEL_SPECS
+
+    hashed = _password_hash()  # one bcrypt hash shared by every synthetic user
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executemany(
+        "INSERT INTO users (email, email_canonical, password, fullname) VALUES (?, ?, ?, ?)",
+        ((f"user{i}@bench.example.com", f"user{i}@bench.example.com", hashed, f"Bench User {i}") for i in range(users))
+    )
+    user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+    focus_id = None
+    if focus_email:
+        conn.execute(
+            "INSERT INTO users (email, email_canonical, password, fullname) VALUES (?, ?, ?, ?)",
+            (focus_email, focus_email, hashed, "Focus User")
+        )
+        focus_id = conn.execute("SELECT id FROM users WHERE email_canonical = ?", (focus_email,)).fetchone()[0]
+
+    inputs = {name: json.dumps(_sample_features(rng, spec["feature_names"])) for name, spec in MODEL_SPECS.items()}
+    now = datetime.utcnow()
+
+    def rows(count, owner=None):
+        for _ in range(count):
+            model = rng.choice(list(MODEL_SPECS))
+            risk = round(rng.uniform(0, 100), 1)
+            timestamp = (now - timedelta(seconds=rng.randrange(60 * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+            user_id = owner if owner is not None else (rng.choice(user_ids) if user_ids and rng.random() < 0.9 else None)
+            yield (user_id, ASSESSMENT_TYPES[model], inputs[model], f"{risk}% Risk", timestamp,
+                   risk, "builtin", round(rng.uniform(1, 20), 2))
+
+    insert = '''
+        INSERT INTO predictions (user_id, type, inputs, outcome, timestamp, risk_pct, model_version, latency_ms)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    conn.executemany(insert, rows(predictions))
+    if focus_id is not None:
+        conn.executemany(insert, rows(focus_rows, focus_id))
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+# ─────────────── Benchmark Groups ─────────────── #
+def bench_inference(ctx):
+    """Single and 1,000-row batch scoring for each model, sklearn and compiled paths."""
+    from backend.inference import MODEL_SPECS, load_predictor
+
+    batch_rows = 1000
+    for name, spec in MODEL_SPECS.items():
+        variants = {"sklearn": load_predictor(name, compiled_dir=os.path.join(ctx.work_dir, "no-compiled"))}
+        compiled = load_predictor(name)
+        if type(compiled.model).__name__ == "CompiledModel":
+            variants["compiled"] = compiled
+        else:
+            ctx.record("inference", f"inference.single[{name},compiled]",
+                       {"status": "skipped", "reason": "no up-to-date export in backend/compiled/"})
+        features = _sample_features(ctx.rng, spec["feature_names"])
+        rows = [_sample_features(ctx.rng, spec["feature_names"]) for _ in range(batch_rows)]
+        for variant, predictor in variants.items():
+            ctx.record("inference", f"inference.single[{name},{variant}]", measure(
+                lambda: predictor.predict(features), repeat=ctx.samples(30, 10), number=50, warmup=20))
+            ctx.record("inference", f"inference.batch{batch_rows}[{name},{variant}]", measure(
+                lambda: predictor.predict_batch(rows), repeat=ctx.samples(15, 5), items=batch_rows))
+
+
+def bench_prediction_log(ctx):
+    """log_prediction throughput, synchronous and through the background writer."""
+    from backend import database
+    from backend.inference import MODEL_SPECS
+
+    ctx.use_database("prediction_log")
+    email = "logger@bench.example.com"
+    populate(database.DB_PATH, users=0, predictions=0, rng=ctx.rng, focus_email=email)
+    inputs = _sample_features(ctx.rng, MODEL_SPECS["heart"]["feature_names"])
+
+    def log_one():
+        database.log_prediction(email, "Heart Disease", inputs, "42.0% Risk",
+                                model_version="builtin", latency_ms=3.2)
+
+    saved = database.PREDICTION_LOG_ASYNC
+    try:
+        database.PREDICTION_LOG_ASYNC = False
+        ctx.record("log", "log_prediction.sync", measure(
+            log_one, repeat=ctx.samples(10, 5), number=100, warmup=10))
+
+        events = ctx.samples(2000, 500)
+
+        def burst():
+            for _ in range(events):
+                log_one()
+            database.flush_prediction_log()
+
+        database.PREDICTION_LOG_ASYNC = True
+        ctx.record("log", f"log_prediction.async{events}", measure(
+            burst, repeat=ctx.samples(5, 3), items=events))
+    finally:
+        database.PREDICTION_LOG_ASYNC = saved
+
+
+def bench_history(ctx):
+    """Dashboard reads for a user with 10, 1k and 100k logged predictions."""
+    from backend import database
+    from backend.main import HISTORY_PAGE_SIZE
+
+    for size in ctx.samples(HISTORY_SIZES, QUICK_HISTORY_SIZES):
+        ctx.use_database(f"history_{size}")
+        email = "history@bench.example.com"
+        populate(database.DB_PATH, users=100, predictions=1000, rng=ctx.rng, focus_email=email, focus_rows=size)
+        conn = database.get_db_connection()
+        user_id = conn.execute("SELECT id FROM users WHERE email_canonical = ?", (email,)).fetchone()["id"]
+        conn.close()
+        ctx.record("history", f"get_user_predictions.page[rows={size}]", measure(
+            lambda: database.get_user_predictions(user_id, limit=HISTORY_PAGE_SIZE + 1),
+            repeat=ctx.samples(30, 10), number=20))
+        full_repeat = 3 if size >= 100_000 else ctx.samples(15, 5)
+        ctx.record("history", f"get_user_predictions.all[rows={size}]", measure(
+            lambda: database.get_user_predictions(user_id), repeat=full_repeat, items=size))
+        ctx.record("history", f"dashboard_summary[rows={size}]", measure(
+            lambda: (database.get_wellness_score(user_id), database.get_latest_predictions(user_id)),
+            repeat=ctx.samples(30, 10), number=20))
+
+
+def bench_auth(ctx):
+    """Register and login through the API, bcrypt included."""
+    ctx.use_database("auth")
+    counter = iter(range(10 ** 9))
+
+    def register():
+        response = ctx.client.post("/api/register", json={
+            "email": f"new{next(counter)}@bench.example.com", "password": BENCH_PASSWORD, "fullname": "New User"})
+        assert response.status_code == 200, response.text
+
+    def login():
+        response = ctx.client.post("/api/login", json={"email": "new0@bench.example.com", "password": BENCH_PASSWORD})
+        assert response.status_code == 200, response.text
+
+    ctx.record("auth", "api.register", measure(register, repeat=ctx.samples(8, 3)))
+    ctx.record("auth", "api.login", measure(login, repeat=ctx.samples(8, 3)))
+
+
+def bench_pdf(ctx):
+    """Uncached PDF report rendering in English and Marathi."""
+    backend_dir = os.path.join(PROJECT_ROOT, "backend")
+    if backend_dir not in sys.path:
+        sys.path.append(backend_dir)
+    try:
+        import utils  # backend/utils.py, as the Streamlit apps import it
+    except ImportError as e:
+        for lang in REPORT_TEXT:
+            ctx.record("pdf", f"pdf_report.render[{lang}]", {"status": "skipped", "reason": str(e)})
+        return
+    for lang, (title, patient_info, content) in REPORT_TEXT.items():
+        try:
+            utils._render_pdf_report(content, 63.4, title, patient_info, lang)
+        except Exception as e:
+            # e.g. no Devanagari font installed for the Marathi report
+            ctx.record("pdf", f"pdf_report.render[{lang}]", {"status": "error", "reason": f"{type(e).__name__}: {e}"})
+            continue
+        ctx.record("pdf", f"pdf_report.render[{lang}]", measure(
+            lambda: utils._render_pdf_report(content, 63.4, title, patient_info, lang),
+            repeat=ctx.samples(15, 5)))
+
+
+def bench_admin_stats(ctx):
+    """/api/admin/stats on a large synthetic database."""
+    from backend import database
+
+    dataset = ctx.samples(ADMIN_DATASET, QUICK_ADMIN_DATASET)
+    ctx.use_database("admin_stats")
+    populate(database.DB_PATH, rng=ctx.rng, **dataset)
+    conn = sqlite3.connect(database.DB_PATH)
+    conn.execute("UPDATE users SET is_admin = 1 WHERE email_canonical = 'user0@bench.example.com'")
+    conn.commit()
+    conn.close()
+
+    response = ctx.client.post("/api/login", json={"email": "user0@bench.example.com", "password": BENCH_PASSWORD})
+    headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+    def stats():
+        response = ctx.client.get("/api/admin/stats", headers=headers)
+        assert response.status_code == 200, response.text
+
+    ctx.record("admin", f"api.admin_stats[users={dataset['users']},predictions={dataset['predictions']}]",
+               measure(stats, repeat=ctx.samples(30, 10), number=5))
+
+
+def bench_llm(ctx):
+    """Overhead of the pooled LLM client against the zero-latency fake server."""
+    from backend.llm_client import get_llm_client
+
+    client = get_llm_client()
+    messages = [{"role": "system", "content": "You are a helpful assistant."},
+                {"role": "user", "content": "Explain my heart disease risk of 63.4%."}]
+    ctx.record("llm", "llm_client.complete", measure(
+        lambda: client.complete("fake", messages), repeat=ctx.samples(30, 10), number=5, warmup=3))
+    ctx.record("llm", "llm_client.stream", measure(
+        lambda: "".join(client.stream("fake", messages)), repeat=ctx.samples(30, 10), number=5, warmup=3))
+
+    # Streamlit sessions call the blocking facade from their own script threads
+    concurrent = 32
+    with ThreadPoolExecutor(max_workers=concurrent) as pool:
+        def fan_out():
+            list(pool.map(lambda _: client.complete("fake", messages), range(concurrent)))
+
+        ctx.record("llm", f"llm_client.complete.concurrent{concurrent}", measure(
+            fan_out, repeat=ctx.samples(10, 5), items=concurrent))
+
+
+GROUPS = {
+    "inference": bench_inference,
+    "log": bench_prediction_log,
+    "history": bench_history,
+    "auth": bench_auth,
+    "pdf": bench_pdf,
+    "admin": bench_admin_stats,
+    "llm": bench_llm,
+}
+
+
+# ─────────────── CLI ─────────────── #
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the HealthPredict benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="Smaller datasets and fewer samples")
+    parser.add_argument("--only", nargs="+", choices=sorted(GROUPS), help="Benchmark groups to run")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write this run's JSON results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Results file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before a regression (0.25 = 25%%)")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if any benchmark regressed")
+    args = parser.parse_args(argv)
+
+    ctx = Context(args.quick)
+    try:
+        for name in args.only or GROUPS:
+            print(f"[{name}]")
+            try:
+                GROUPS[name](ctx)
+            except Exception as e:
+                traceback.print_exc()
+                ctx.record(name, f"{name}.group", {"status": "error", "reason": f"{type(e).__name__}: {e}"})
+    finally:
+        ctx.close()
+
+    results = {
+        "environment": environment(),
+        "options": {"quick": args.quick, "groups": args.only or list(GROUPS)},
+        "benchmarks": ctx.results,
+    }
+    write_results(args.output, results)
+    print(f"\nResults written to {args.output}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        baseline = load_results(args.baseline)
+        rows, regressions = compare(results, baseline, args.tolerance)
+        print(f"\nCompared with {args.baseline} (recorded {baseline.get('environment', {}).get('timestamp')}):")
+        print(format_table(rows))
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than baseline by more than {args.tolerance:.0%}")
+    if args.save_baseline:
+        write_results(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
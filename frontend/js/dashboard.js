@@ -83,17 +83,21 @@ async function fetchAdminStats() {
     }
 }
 
+// Keyset cursor for the next page of the user's history (null when exhausted)
+let historyCursor = null;
+
 async function fetchUserStats() {
     const token = localStorage.getItem('token');
     try {
-        const response = await fetch(`http://localhost:8000/api/user/stats`, {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
+        const headers = { 'Authorization': `Bearer ${token}` };
+        // Summary and the first history page are fetched in parallel; both stay small as history grows
+        const [summaryResponse, historyResponse] = await Promise.all([
+            fetch(`http://localhost:8000/api/user/summary`, { headers }),
+            fetch(`http://localhost:8000/api/user/predictions`, { headers })
+        ]);
         
-        if (!response.ok) {
-            if (response.status === 401) {
+        if (!summaryResponse.ok || !historyResponse.ok) {
+            if (summaryResponse.status === 401 || historyResponse.status === 401) {
                 hAlert('Session Expired', 'Session expired. Please log in again.', () => {
                     window.location.href = 'login.html';
                 });
@@ -102,37 +106,62 @@ async function fetchUserStats() {
             throw new Error('Failed to fetch user stats');
         }
 
-        const data = await response.json();
+        const summary = await summaryResponse.json();
+        const history = await historyResponse.json();
         
         // Update Wellness Score
         const wellnessScoreEl = document.getElementById('wellnessScore');
-        if (wellnessScoreEl) wellnessScoreEl.textContent = data.wellness_score;
+        if (wellnessScoreEl) wellnessScoreEl.textContent = summary.wellness_score;
         
         // Populate Status Cards (latest of each)
-        populateUserStatusCards(data.predictions);
+        populateUserStatusCards(summary.latest);
         
         // Populate History Table
-        populateUserHistoryTable(data.predictions);
+        populateUserHistoryTable(history.predictions);
+        setHistoryCursor(history.next_cursor);
 
     } catch (error) {
         console.error('Error loading user dashboard:', error);
     }
 }
 
-function populateUserStatusCards(predictions) {
+async function loadMoreHistory() {
+    if (!historyCursor) return;
+    const token = localStorage.getItem('token');
+    const btn = document.getElementById('loadMoreHistoryBtn');
+    if (btn) btn.disabled = true;
+    try {
+        const response = await fetch(`http://localhost:8000/api/user/predictions?cursor=${encodeURIComponent(historyCursor)}`, {
+            headers: {
+                'Authorization': `Bearer ${token}`
+            }
+        });
+        if (!response.ok) throw new Error('Failed to fetch history');
+
+        const data = await response.json();
+        appendUserHistoryRows(data.predictions);
+        setHistoryCursor(data.next_cursor);
+    } catch (error) {
+        console.error('Error loading more history:', error);
+    } finally {
+        if (btn) btn.disabled = false;
+    }
+}
+
+function setHistoryCursor(cursor) {
+    historyCursor = cursor;
+    const btn = document.getElementById('loadMoreHistoryBtn');
+    if (!btn) return;
+    btn.style.display = cursor ? 'block' : 'none';
+    btn.onclick = loadMoreHistory;
+}
+
+function populateUserStatusCards(latest) {
     const list = document.getElementById('userHealthList');
     if (!list) return;
     list.innerHTML = '';
     
     const types = ["Heart Disease", "Diabetes", "Parkinson's"];
-    const latest = {};
-    
-    // Find latest for each type
-    predictions.forEach(p => {
-        if (!latest[p.type]) {
-            latest[p.type] = p;
-        }
-    });
     
     types.forEach(type => {
         const card = document.createElement('div');
@@ -164,6 +193,13 @@ function populateUserHistoryTable(predictions) {
         return;
     }
 
+    appendUserHistoryRows(predictions);
+}
+
+function appendUserHistoryRows(predictions) {
+    const body = document.getElementById('userHistoryBody');
+    if (!body) return;
+
     predictions.forEach(p => {
         const row = document.createElement('tr');
         const date = new Date(p.timestamp).toLocaleString();
@@ -5,19 +5,21 @@ import sqlite3
 # Add the project root to sys.path to import backend modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.database import get_db_connection
+from backend.database import get_db_connection, init_db, canonical_email
 
 def create_admin(email):
+    init_db()
+    email = canonical_email(email)
     conn = get_db_connection()
     cursor = conn.cursor()
     
     # Check if user exists
-    cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
+    cursor.execute("SELECT * FROM users WHERE email_canonical = ?", (email,))
     user = cursor.fetchone()
     
     if user:
         print(f"User {email} found. Promoting to admin...")
-        cursor.execute("UPDATE users SET is_admin = 1 WHERE email = ?", (email,))
+        cursor.execute("UPDATE users SET is_admin = 1 WHERE email_canonical = ?", (email,))
     else:
         print(f"User {email} not found. Creating default admin account...")
         # Default password is 'admin123'
@@ -26,8 +28,8 @@ def create_admin(email):
         hashed_password = pwd_context.hash("admin123")
         
         cursor.execute(
-            "INSERT INTO users (email, password, fullname, is_admin) VALUES (?, ?, ?, ?)",
-            (email, hashed_password, "System Admin", 1)
+            "INSERT INTO users (email, email_canonical, password, fullname, is_admin) VALUES (?, ?, ?, ?, ?)",
+            (email, email, hashed_password, "System Admin", 1)
         )
     
     conn.commit()
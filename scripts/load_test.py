@@ -0,0 +1,341 @@
+"""
+Concurrent load generator for the HealthPredict API.
+
+Simulates virtual users, each with its own session and account, that repeatedly
+pick an action from a weighted mix (signup, login, dashboard polling, headless
+predictions) with a short think time in between. Reports throughput over
+the steady-state window (after ramp-up) and p50/p95/p99 latency and error
+rate per endpoint.
+
+With --spawn it starts its own uvicorn instance on a throwaway database, with
+the Streamlit apps disabled and the LLM pointed at benchmarks/fake_llm.py, so
+the whole run is offline and leaves backend/data/ untouched.
+
+Usage:
+    python scripts/load_test.py --spawn --workers 2 --users 50 --duration 60
+    python scripts/load_test.py --base-url http://127.0.0.1:8000 --mix dashboard --users 200
+    python scripts/load_test.py --spawn --think-time 0 --json results.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import requests
+
+# Add the project root to sys.path to import backend modules
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from backend.inference import MODEL_SPECS
+
+PASSWORD = "loadtest-password-123"
+
+# Relative weights of the actions a virtual user picks between think times
+MIXES = {
+    "default": {"signup": 2, "login": 8, "dashboard": 60, "predict": 25, "predict_batch": 5},
+    "dashboard": {"login": 5, "dashboard": 95},
+    "predict": {"predict": 85, "predict_batch": 15},
+    "signup": {"signup": 60, "login": 40},
+}
+
+
+# ─────────────── Statistics ─────────────── #
+class Stats:
+    """Latencies and outcomes per endpoint, shared by all virtual users."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        # Monotonic completion time of each request, for steady-state throughput
+        self.finished = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, status, ok):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.finished[endpoint].append(time.monotonic())
+            self.statuses[endpoint][status] += 1
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(stats, elapsed, steady_start, steady_end):
+    """
+    Summarize a run. Latencies and errors cover every request; throughput
+    counts only requests completed between steady_start and steady_end
+    (monotonic times), so the ramp-up and the final drain do not dilute it.
+    """
+    steady_seconds = max(steady_end - steady_start, 1e-9)
+    endpoints = {}
+    total = errors = steady_total = 0
+    for endpoint, values in sorted(stats.latencies.items()):
+        values = sorted(values)
+        count = len(values)
+        steady = sum(1 for t in stats.finished[endpoint] if steady_start <= t <= steady_end)
+        total += count
+        steady_total += steady
+        errors += stats.errors[endpoint]
+        endpoints[endpoint] = {
+            "requests": count,
+            "errors": stats.errors[endpoint],
+            "error_rate": round(stats.errors[endpoint] / count, 4),
+            "throughput_rps": round(steady / steady_seconds, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+            "statuses": {str(k): v for k, v in sorted(stats.statuses[endpoint].items(), key=lambda kv: str(kv[0]))},
+        }
+    return {
+        "duration_seconds": round(elapsed, 2),
+        "steady_state_seconds": round(steady_end - steady_start, 2),
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(steady_total / steady_seconds, 2),
+        "endpoints": endpoints,
+    }
+
+
+def print_report(summary):
+    print(f"\n{summary['requests']} requests in {summary['duration_seconds']}s: "
+          f"{summary['throughput_rps']} req/s over the {summary['steady_state_seconds']}s steady state, "
+          f"error rate {summary['error_rate']:.2%}\n")
+    width = max([len(e) for e in summary["endpoints"]] + [8])
+    print(f"{'endpoint':<{width}}  {'reqs':>7}  {'rps':>8}  {'err%':>6}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  {'max ms':>8}")
+    for endpoint, s in summary["endpoints"].items():
+        print(f"{endpoint:<{width}}  {s['requests']:>7}  {s['throughput_rps']:>8}  {s['error_rate']:>6.1%}  "
+              f"{s['p50_ms']:>8}  {s['p95_ms']:>8}  {s['p99_ms']:>8}  {s['max_ms']:>8}")
+        unexpected = {k: v for k, v in s["statuses"].items() if not k.startswith("2")}
+        if unexpected:
+            print(f"{'':<{width}}  statuses: {unexpected}")
+
+
+# ─────────────── Virtual Users ─────────────── #
+class VirtualUser:
+    def __init__(self, index, base_url, run_id, stats, mix, think_time, timeout, rng):
+        self.base_url = base_url.rstrip("/")
+        self.run_id = run_id
+        self.index = index
+        self.stats = stats
+        self.actions, self.weights = zip(*mix.items())
+        self.think_time = think_time
+        self.timeout = timeout
+        self.rng = rng
+        self.session = requests.Session()
+        self.email = f"loadtest-{run_id}-{index}@example.com"
+        self.token = None
+        self.signups = 0
+
+    def _request(self, endpoint, method, path, expected=(200,), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            # Batch predictions stream NDJSON; time the whole body, not just the headers
+            response.content
+            status = response.status_code
+        except requests.RequestException as e:
+            response, status = None, type(e).__name__
+        self.stats.record(endpoint, time.perf_counter() - start, status, status in expected)
+        return response
+
+    def _auth(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def setup(self):
+        self._request("POST /api/register", "POST", "/api/register", json={
+            "email": self.email, "password": PASSWORD, "fullname": f"Load Test {self.index}"})
+        self.login()
+
+    # Actions
+    def signup(self):
+        self.signups += 1
+        email = f"loadtest-{self.run_id}-{self.index}-{self.signups}@example.com"
+        self._request("POST /api/register", "POST", "/api/register", json={
+            "email": email, "password": PASSWORD, "fullname": "Load Test Signup"})
+
+    def login(self):
+        response = self._request("POST /api/login", "POST", "/api/login", json={
+            "email": self.email, "password": PASSWORD})
+        if response is not None and response.status_code == 200:
+            self.token = response.json()["token"]
+
+    def dashboard(self):
+        # What dashboard.js fetches on each refresh
+        if self.token is None:
+            return self.login()
+        self._request("GET /api/user/summary", "GET", "/api/user/summary", headers=self._auth())
+        self._request("GET /api/user/predictions", "GET", "/api/user/predictions", headers=self._auth())
+
+    def _features(self, model):
+        return {name: round(self.rng.uniform(0, 150), 3) for name in MODEL_SPECS[model]["feature_names"]}
+
+    def predict(self):
+        model = self.rng.choice(list(MODEL_SPECS))
+        self._request("POST /api/predict/{model}", "POST", f"/api/predict/{model}",
+                      json={"features": self._features(model)})
+
+    def predict_batch(self):
+        model = self.rng.choice(list(MODEL_SPECS))
+        rows = [self._features(model) for _ in range(100)]
+        self._request("POST /api/predict/{model}/batch", "POST", f"/api/predict/{model}/batch", json=rows)
+
+    def run(self, deadline):
+        self.setup()
+        while time.monotonic() < deadline:
+            action = self.rng.choices(self.actions, self.weights)[0]
+            getattr(self, action)()
+            if self.think_time:
+                # +/-50% jitter so users do not move in lockstep
+                time.sleep(self.think_time * self.rng.uniform(0.5, 1.5))
+
+
+def run_load(base_url, users, duration, mix, think_time, ramp_up, timeout, seed):
+    stats = Stats()
+    run_id = uuid.uuid4().hex[:8]
+    deadline = time.monotonic() + ramp_up + duration
+    threads = []
+    start = time.monotonic()
+    for i in range(users):
+        user = VirtualUser(i, base_url, run_id, stats, mix, think_time, timeout, random.Random(seed + i))
+        thread = threading.Thread(target=user.run, args=(deadline,), daemon=True)
+        thread.start()
+        threads.append(thread)
+        if ramp_up:
+            time.sleep(ramp_up / users)
+    # Every user is running from here until the deadline
+    steady_start = time.monotonic()
+    for thread in threads:
+        thread.join()
+    return summarize(stats, time.monotonic() - start, steady_start, deadline)
+
+
+# ─────────────── Local Instance ─────────────── #
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API server exited with code {process.returncode}")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.25)
+    raise RuntimeError(f"API server did not answer at {url} within {timeout}s")
+
+
+def spawn_instance(workers, llm_latency):
+    """
+    Start uvicorn on a free port with a throwaway database and a fake LLM.
+
+    Returns:
+        (base_url, cleanup) where cleanup() stops everything and removes the temp files
+    """
+    from benchmarks import fake_llm
+
+    work_dir = tempfile.mkdtemp(prefix="healthpredict-load-")
+    llm = fake_llm.start(latency=llm_latency)
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DB_PATH=os.path.join(work_dir, "users.db"),
+        METRICS_DIR=os.path.join(work_dir, "metrics"),
+        LLM_CACHE_PATH=os.path.join(work_dir, "llm_cache.db"),
+        STREAMLIT_AUTOSTART="0",
+        OPENROUTER_API_KEY="fake",
+        OPENROUTER_BASE_URL=f"http://127.0.0.1:{llm.server_port}/v1",
+    )
+    process = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "backend.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ], cwd=PROJECT_ROOT, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+
+    def cleanup():
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        llm.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    try:
+        _wait_until_up(base_url + "/index.html", process)
+    except Exception:
+        cleanup()
+        raise
+    print(f"Started local API at {base_url} ({workers} worker(s), database in {work_dir})")
+    return base_url, cleanup
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the HealthPredict API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="API to test (ignored with --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="Start a throwaway local instance with a fake LLM")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for --spawn")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fake LLM delay in seconds for --spawn")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load after ramp-up")
+    parser.add_argument("--ramp-up", type=float, default=5, help="Seconds over which users are started")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default", help="Action weights")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause between a user's actions")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the summary to this file")
+    parser.add_argument("--max-error-rate", type=float, help="Exit with status 1 above this overall error rate")
+    args = parser.parse_args()
+
+    cleanup = None
+    base_url = args.base_url
+    if args.spawn:
+        base_url, cleanup = spawn_instance(args.workers, args.llm_latency)
+    try:
+        print(f"Running '{args.mix}' mix: {args.users} users for {args.duration}s "
+              f"(ramp-up {args.ramp_up}s, think time {args.think_time}s) against {base_url}")
+        summary = run_load(base_url, args.users, args.duration, MIXES[args.mix],
+                           args.think_time, args.ramp_up, args.timeout, args.seed)
+    finally:
+        if cleanup:
+            cleanup()
+
+    summary["config"] = {k: v for k, v in vars(args).items() if k != "json"}
+    print_report(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nSummary written to {args.json}")
+    if args.max_error_rate is not None and summary["error_rate"] > args.max_error_rate:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())